@@ -16,17 +16,19 @@ a = Analysis(
 )
 pyz = PYZ(a.pure)
 
+# One-folder build: a one-file EXE unpacks every module and DLL to a temp
+# folder on each launch, which dominated start-up. UPX is off for the same
+# reason; compressed DLLs are decompressed on every load.
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='WhatsAppStoryPoster',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    upx=False,
     upx_exclude=[],
     runtime_tmpdir=None,
     console=False,
@@ -36,3 +38,12 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='WhatsAppStoryPoster',
+)
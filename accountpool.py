@@ -0,0 +1,210 @@
+import os
+import json
+import threading
+from collections import deque
+from webauto import BrowserSession, default_profile_dir, list_story_photos, select_story_photos, post_whatsapp_stories
+from jobjournal import CancelToken
+from storyselect import DEFAULT_POLICY
+
+DEFAULT_MAX_CONCURRENCY = 2
+
+class Account:
+    """A WhatsApp account with its own persistent Chrome profile."""
+
+    def __init__(self, name, profile_dir=None):
+        self.name = name
+        # Each account gets an isolated profile next to the default one
+        self.profile_dir = profile_dir or os.path.join(os.path.dirname(default_profile_dir()), "profiles", name)
+
+    def __repr__(self):
+        return f"Account({self.name!r})"
+
+def load_accounts(config_path):
+    """
+    Read accounts from a JSON file.
+
+    The file holds a list of {"name": ..., "profile_dir": ...} objects;
+    profile_dir is optional.
+    """
+    with open(config_path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    return [Account(entry["name"], entry.get("profile_dir")) for entry in entries]
+
+class PostingJob:
+    """One posting run for one account, as queued on an AccountPool."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    def __init__(self, account, photo_directory, num_photos=None, photos=None, options=None):
+        self.account = account
+        self.photo_directory = photo_directory
+        self.num_photos = num_photos if num_photos is not None else len(photos or [])
+        self.photos = photos
+        self.options = options or {}
+        self.state = self.QUEUED
+        self.posted = 0
+        self.error = None
+        self.cancel_token = CancelToken()
+        self._done = threading.Event()
+
+    def cancel(self):
+        """Cancel the job; a running job stops at its next step boundary."""
+        self.cancel_token.cancel()
+
+    def wait(self, timeout=None):
+        """Block until the job has finished; returns True if it did."""
+        return self._done.wait(timeout)
+
+    def __repr__(self):
+        return f"PostingJob({self.account.name!r}, {self.num_photos} photos, {self.state})"
+
+class AccountPool:
+    """
+    Runs posting jobs for several accounts on a bounded number of browsers.
+
+    Every account has its own queue and its own long-lived BrowserSession on
+    an isolated profile. Up to max_concurrency accounts post at the same time,
+    never more than one job per account (a Chrome profile can only be open
+    once), and accounts take turns round-robin so a long queue on one account
+    cannot starve the others.
+    """
+
+    def __init__(self, accounts, max_concurrency=DEFAULT_MAX_CONCURRENCY, headless=True, performance_log=False):
+        self.accounts = {account.name: account for account in accounts}
+        self.max_concurrency = max(1, max_concurrency)
+        self.headless = headless
+        self.performance_log = performance_log
+        self._queues = {name: deque() for name in self.accounts}
+        self._sessions = {}
+        self._busy = set()
+        self._turns = deque(self.accounts)  # Round-robin order of account names
+        self._condition = threading.Condition()
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f"account-worker-{i}", daemon=True)
+            for i in range(self.max_concurrency)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, account_name, photo_directory, num_photos=None, photos=None, **options):
+        """
+        Queue a posting job for one account.
+
+        Args:
+            account_name (str): Name of a configured account
+            photo_directory (str): Folder to pick photos from
+            num_photos (int): Number of random photos, if photos is not given
+            photos (list): Explicit photos to post
+            **options: Extra keyword arguments for post_whatsapp_stories
+
+        Returns:
+            PostingJob: The queued job
+        """
+        job = PostingJob(self.accounts[account_name], photo_directory, num_photos, photos, options)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("AccountPool is shut down")
+            self._queues[account_name].append(job)
+            self._condition.notify()
+        return job
+
+    def distribute_folder(self, photo_directory, num_photos, account_names=None, **options):
+        """
+        Pick num_photos random photos from a folder and split them across accounts.
+
+        Photos are dealt out round-robin, so no photo goes to two accounts and
+        the shares differ by at most one. With a catalog in options, duplicates
+        are left out of the pick.
+
+        Returns:
+            list: The queued PostingJobs, one per account that received photos
+        """
+        names = list(account_names or self.accounts)
+        all_photos = list_story_photos(photo_directory, options.get("photo_index"))
+        selected = select_story_photos(
+            all_photos, num_photos, photo_directory, options.get("catalog"),
+            options.pop("selection_policy", DEFAULT_POLICY), options.pop("no_repeat_days", None)
+        )
+
+        shares = {name: selected[i::len(names)] for i, name in enumerate(names)}
+        return [
+            self.submit(name, photo_directory, photos=share, **options)
+            for name, share in shares.items() if share
+        ]
+
+    def wait(self, jobs=None, timeout=None):
+        """Wait for jobs (default: everything queued or running) to finish."""
+        if jobs is not None:
+            return all(job.wait(timeout) for job in jobs)
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._busy and not any(self._queues.values()), timeout
+            )
+
+    def shutdown(self, close_sessions=True):
+        """Stop the workers once queued jobs are done and optionally close the browsers."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join()
+        if close_sessions:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+    def _next_job(self):
+        """Return the next job in round-robin order whose account is idle. Caller holds the lock."""
+        for _ in range(len(self._turns)):
+            name = self._turns[0]
+            self._turns.rotate(-1)
+            if name not in self._busy and self._queues[name]:
+                return self._queues[name].popleft()
+        return None
+
+    def _session_for(self, account):
+        session = self._sessions.get(account.name)
+        if session is None:
+            session = BrowserSession(profile_dir=account.profile_dir, headless=self.headless,
+                                     performance_log=self.performance_log)
+            self._sessions[account.name] = session
+        return session
+
+    def _work(self):
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None:
+                    if self._closed and not any(self._queues.values()):
+                        return
+                    self._condition.wait()
+                    job = self._next_job()
+                if job.cancel_token.cancelled:
+                    job.state = PostingJob.CANCELLED
+                    job._done.set()
+                    continue
+                self._busy.add(job.account.name)
+                session = self._session_for(job.account)
+                job.state = PostingJob.RUNNING
+
+            try:
+                print(f"[{job.account.name}] Posting {job.num_photos} photos from {job.photo_directory}")
+                job.posted = post_whatsapp_stories(
+                    job.photo_directory, job.num_photos, self.headless,
+                    session=session, photos=job.photos, cancel_token=job.cancel_token, **job.options
+                ) or 0
+                job.state = PostingJob.CANCELLED if job.cancel_token.cancelled else PostingJob.DONE
+            except Exception as e:
+                job.error = e
+                job.state = PostingJob.FAILED
+                print(f"[{job.account.name}] Posting job failed: {e}")
+            finally:
+                with self._condition:
+                    self._busy.discard(job.account.name)
+                    self._condition.notify_all()
+                job._done.set()
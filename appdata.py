@@ -0,0 +1,8 @@
+import os
+
+APP_NAME = "WhatsAppStoryPoster"
+
+def data_path(*parts):
+    """Return a path inside the per-user application data directory ($XDG_DATA_HOME or ~/.local/share)."""
+    base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, APP_NAME, *parts)
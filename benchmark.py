@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+from mockwhatsapp import MockWhatsAppServer, DEFAULT_CONFIG
+from steptrace import load_spans, load_runs, summarize, percentile
+
+# Scenarios run by default: (name, batch_size, mock page settings)
+SCENARIOS = [
+    ("single", 1, {}),
+    ("batch", 10, {}),
+    ("batch-drift", 10, {"drift": 0.5}),
+    ("no-multiple", 10, {"multiple": False}),
+]
+
+def make_photos(directory, count, size=(3000, 4000)):
+    """Write count distinct JPEGs of a phone-camera size to directory and return their paths."""
+    from PIL import Image
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"bench_{i:03d}.jpg")
+        if not os.path.exists(path):
+            color = ((i * 37) % 256, (i * 91) % 256, (i * 53) % 256)
+            Image.new("RGB", size, color).save(path, "JPEG", quality=92)
+        paths.append(path)
+    return paths
+
+def run_scenario(server, name, batch_size, page_config, photos, work_dir, optimize=True, performance_log=False):
+    """
+    Post photos to the mock page in a fresh headless browser and collect timings.
+
+    Returns:
+        dict: Scenario results with per-photo and per-batch latency percentiles, and the
+            path of Chrome's performance log if performance_log was set
+    """
+    from webauto import BrowserSession, post_whatsapp_stories, ON_FINISH_RELEASE
+    from selectorengine import SelectorResolver
+
+    trace_path = os.path.join(work_dir, f"{name}.jsonl")
+    session = BrowserSession(
+        profile_dir=os.path.join(work_dir, f"profile-{name}"), headless=True, url=server.url_for(**page_config),
+        performance_log=performance_log
+    )
+    # A fresh resolver per scenario, so learned selectors do not carry over
+    resolver = SelectorResolver(stats_path=os.path.join(work_dir, f"selectors-{name}.json"))
+    try:
+        posted = post_whatsapp_stories(
+            work_dir, len(photos), headless=True, session=session, resolver=resolver,
+            batch_size=batch_size, optimize=optimize, photos=photos, journal=False,
+            on_finish=ON_FINISH_RELEASE, trace_path=trace_path
+        )
+        confirmed = session.driver.execute_script("return window.__mockStats.posted") if session.driver else None
+    finally:
+        session.close()
+
+    spans = load_spans(trace_path)
+    round_trips = [span for span in spans if span["step"] == "round_trip"]
+    per_batch = [span["duration"] for span in round_trips]
+    # Every photo of a batch is counted with the batch's share of the round trip
+    per_photo = [
+        span["duration"] / span.get("photos", 1) for span in round_trips for _ in range(span.get("photos", 1))
+    ]
+    runs = load_runs(trace_path)
+    # The poster saves the log as perf/<run_id>.jsonl next to the trace
+    perf_path = os.path.join(work_dir, "perf", f"{runs[-1]['run_id']}.jsonl") if runs else None
+    return {
+        "scenario": name,
+        "batch_size": batch_size,
+        "mock": page_config,
+        "photos": len(photos),
+        "posted": posted,
+        "confirmed_by_page": confirmed,
+        "per_photo_p50": percentile(per_photo, 0.5),
+        "per_photo_p95": percentile(per_photo, 0.95),
+        "per_batch_p50": percentile(per_batch, 0.5),
+        "per_batch_p95": percentile(per_batch, 0.95),
+        "run_seconds": runs[-1]["duration"] if runs else None,
+        "steps": summarize(spans),
+        "performance_log": perf_path if perf_path and os.path.exists(perf_path) else None,
+    }
+
+def format_results(results):
+    """Format scenario results as a table."""
+    def sec(value):
+        return f"{value:>10.2f}s" if value is not None else f"{'-':>11}"
+
+    lines = [
+        f"{'scenario':<14}{'photos':>7}{'posted':>7}{'photo p50':>11}{'photo p95':>11}"
+        f"{'batch p50':>11}{'batch p95':>11}{'run':>11}"
+    ]
+    for r in results:
+        lines.append(
+            f"{r['scenario']:<14}{r['photos']:>7}{r['posted']:>7}"
+            f"{sec(r['per_photo_p50'])}{sec(r['per_photo_p95'])}{sec(r['per_batch_p50'])}{sec(r['per_batch_p95'])}"
+            f"{sec(r['run_seconds'])}"
+        )
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the story poster against the offline mock WhatsApp Web.")
+    parser.add_argument("--photos", type=int, default=20, help="Photos posted per scenario")
+    parser.add_argument("--scenario", action="append", help="Only run these scenarios (repeatable)")
+    parser.add_argument("--no-optimize", action="store_true", help="Upload the original files")
+    parser.add_argument("--delay-scale", type=float, default=1.0, help="Multiply the mock's delays")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--keep", action="store_true", help="Keep the work directory with traces")
+    parser.add_argument("--performance-log", action="store_true",
+                        help="Also save Chrome's performance log per scenario (implies --keep)")
+    args = parser.parse_args(argv)
+
+    scenarios = [s for s in SCENARIOS if not args.scenario or s[0] in args.scenario]
+    work_dir = tempfile.mkdtemp(prefix="story-bench-")
+    timings = {
+        key: int(value * args.delay_scale) for key, value in DEFAULT_CONFIG.items() if key.endswith("_ms")
+    }
+    try:
+        photos = make_photos(os.path.join(work_dir, "photos"), args.photos)
+        results = []
+        with MockWhatsAppServer(**timings) as server:
+            for name, batch_size, page_config in scenarios:
+                print(f"Running scenario '{name}'...", file=sys.stderr)
+                results.append(run_scenario(
+                    server, name, batch_size, page_config, photos, work_dir, optimize=not args.no_optimize,
+                    performance_log=args.performance_log
+                ))
+        print(json.dumps(results, indent=1) if args.json else format_results(results))
+    finally:
+        if args.keep or args.performance_log:
+            print(f"Traces kept in {work_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+# Command-line entry point for servers without a display:
+#
+#     python cli.py post FOLDER [-n 5] [--policy weighted_age] [--performance-log] [--json]
+#     python cli.py post FOLDER --accounts ACCOUNTS.json [--max-concurrency 2]
+#     python cli.py scan FOLDER [FOLDER ...] [--duplicates] [--json]
+#     python cli.py weight 2 PHOTO [PHOTO ...] [--json]
+#     python cli.py schedule CONFIG.json [--once] [--json]
+#
+# Only the standard library is imported up front; selenium and PIL are loaded
+# by the subcommands that need them, and tkinter never is.
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import contextlib
+
+# Exit codes
+EXIT_OK = 0
+EXIT_FAILED = 1       # Nothing was posted, or the command failed
+EXIT_USAGE = 2        # Bad arguments or config (argparse uses 2 as well)
+EXIT_PARTIAL = 3      # Some, but not all, photos were posted
+EXIT_CANCELLED = 130  # Stopped by SIGINT/SIGTERM
+
+# Names from storyselect.POLICIES, repeated here so parsing arguments imports nothing heavy
+POLICY_NAMES = ["weighted_age", "least_recent", "weighted_manual", "random"]
+DEFAULT_POLICY = "weighted_age"
+# accountpool.DEFAULT_MAX_CONCURRENCY, repeated for the same reason
+DEFAULT_MAX_CONCURRENCY = 2
+
+# Results are the only thing written here; main() sends everything else printed to stderr
+results_stream = sys.stdout
+
+def emit(result, as_json):
+    """Print a command result as one JSON line or as readable key/value lines."""
+    if as_json:
+        print(json.dumps(result, ensure_ascii=False, default=str), file=results_stream, flush=True)
+    else:
+        for key, value in result.items():
+            print(f"{key}: {value}", file=results_stream)
+
+def install_cancel_handlers():
+    """Turn SIGINT/SIGTERM into a cooperative cancel of the running job and return its token."""
+    from jobjournal import CancelToken
+    token = CancelToken()
+
+    def handle(signum, frame):
+        print("Stopping after the current step...", file=sys.stderr)
+        token.cancel()
+
+    signal.signal(signal.SIGINT, handle)
+    signal.signal(signal.SIGTERM, handle)
+    return token
+
+def open_catalog(path, folders, photo_index=None):
+    """Open the photo catalog and bring the given folders up to date (listed through photo_index if given)."""
+    from photolibrary import PhotoCatalog
+    from photowatch import scan_folder
+    catalog = PhotoCatalog(path)
+    for folder in folders:
+        catalog.sync_folder(folder, photo_index.photos(folder) if photo_index else scan_folder(folder))
+    return catalog
+
+def exit_code_for(posted, requested, cancelled):
+    if cancelled:
+        return EXIT_CANCELLED
+    if posted == 0:
+        return EXIT_FAILED
+    if posted < requested:
+        return EXIT_PARTIAL
+    return EXIT_OK
+
+def post_job(folder, num_photos, options, session=None, cancel_token=None, catalog_path=None):
+    """
+    Run one posting job and return its result dict.
+
+    options holds post settings: headless, profile_dir, policy, no_repeat_days,
+    batch_size, optimize, resume, on_finish, use_catalog, performance_log, and
+    accounts and max_concurrency to split the photos across several accounts.
+    """
+    if options.get("accounts"):
+        return post_accounts_job(folder, num_photos, options, cancel_token=cancel_token, catalog_path=catalog_path)
+
+    from webauto import post_whatsapp_stories, BrowserSession, ON_FINISH_CLOSE, ON_FINISH_RELEASE
+    from jobjournal import JobJournal
+    from progress import ProgressChannel, JOB_STARTED
+    from photowatch import PhotoLibraryIndex
+
+    folder = os.path.abspath(folder)
+    if not os.path.isdir(folder):
+        return {"command": "post", "folder": folder, "error": "folder not found", "exit_code": EXIT_USAGE}
+
+    # One unwatched listing of the folder serves both the catalog sync and the photo selection
+    photo_index = PhotoLibraryIndex(folder, use_inotify=False, scan=False)
+    catalog = open_catalog(catalog_path, [folder], photo_index) if options.get("use_catalog", True) else None
+    journal = JobJournal.find_resumable(folder) if options.get("resume") else None
+    if session is None:
+        session = BrowserSession(profile_dir=options.get("profile_dir"), headless=options.get("headless", True),
+                                 performance_log=options.get("performance_log", False))
+        on_finish = options.get("on_finish") or ON_FINISH_CLOSE
+    else:
+        on_finish = options.get("on_finish") or ON_FINISH_RELEASE
+
+    # The poster reports how many photos it actually selected, which can be
+    # fewer than asked for when the folder or the filters leave fewer
+    channel = ProgressChannel()
+    start = time.time()
+    try:
+        posted = post_whatsapp_stories(
+            folder, num_photos, session.headless, photo_index=photo_index, catalog=catalog, session=session,
+            batch_size=options.get("batch_size", 10), optimize=options.get("optimize", True),
+            cancel_token=cancel_token, journal=journal, on_finish=on_finish, progress_channel=channel,
+            selection_policy=options.get("policy") or DEFAULT_POLICY,
+            no_repeat_days=options.get("no_repeat_days")
+        ) or 0
+    finally:
+        if catalog is not None:
+            catalog.close()
+
+    requested = next((event.total for event in channel.drain() if event.kind == JOB_STARTED), 0)
+    cancelled = cancel_token is not None and cancel_token.cancelled
+    return {
+        "command": "post",
+        "folder": folder,
+        "requested": requested,
+        "posted": posted,
+        "resumed_job": journal.job_id if journal else None,
+        "cancelled": cancelled,
+        "duration": round(time.time() - start, 2),
+        "exit_code": exit_code_for(posted, requested, cancelled),
+    }
+
+def post_accounts_job(folder, num_photos, options, pool=None, cancel_token=None, catalog_path=None):
+    """
+    Pick photos from a folder, split them across the accounts in options["accounts"] and post them.
+
+    A given pool is reused and left running; otherwise one is started for the
+    job and shut down with its browsers afterwards.
+    """
+    from accountpool import AccountPool, load_accounts
+    from photowatch import PhotoLibraryIndex
+
+    folder = os.path.abspath(folder)
+    if not os.path.isdir(folder):
+        return {"command": "post", "folder": folder, "error": "folder not found", "exit_code": EXIT_USAGE}
+    owns_pool = pool is None
+    if owns_pool:
+        try:
+            accounts = load_accounts(options["accounts"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            return {"command": "post", "folder": folder, "error": f"invalid accounts: {e}", "exit_code": EXIT_USAGE}
+        pool = AccountPool(accounts, options.get("max_concurrency") or DEFAULT_MAX_CONCURRENCY,
+                           headless=options.get("headless", True),
+                           performance_log=options.get("performance_log", False))
+
+    photo_index = PhotoLibraryIndex(folder, use_inotify=False, scan=False)
+    catalog = open_catalog(catalog_path, [folder], photo_index) if options.get("use_catalog", True) else None
+    start = time.time()
+    try:
+        jobs = pool.distribute_folder(
+            folder, num_photos, photo_index=photo_index, catalog=catalog,
+            batch_size=options.get("batch_size", 10), optimize=options.get("optimize", True),
+            selection_policy=options.get("policy") or DEFAULT_POLICY,
+            no_repeat_days=options.get("no_repeat_days")
+        )
+        # Every account has its own token; pass a cancel on to all of them
+        while not pool.wait(jobs, timeout=0.5):
+            if cancel_token is not None and cancel_token.cancelled:
+                for job in jobs:
+                    job.cancel()
+    finally:
+        if owns_pool:
+            pool.shutdown()
+        if catalog is not None:
+            catalog.close()
+
+    requested = sum(len(job.photos) for job in jobs)
+    posted = sum(job.posted for job in jobs)
+    cancelled = cancel_token is not None and cancel_token.cancelled
+    return {
+        "command": "post",
+        "folder": folder,
+        "requested": requested,
+        "posted": posted,
+        "accounts": {
+            job.account.name: {"requested": len(job.photos), "posted": job.posted, "state": job.state,
+                               "error": job.error}
+            for job in jobs
+        },
+        "cancelled": cancelled,
+        "duration": round(time.time() - start, 2),
+        "exit_code": exit_code_for(posted, requested, cancelled),
+    }
+
+def post_options(args):
+    return {
+        "headless": not args.show_browser,
+        "profile_dir": args.profile,
+        "policy": args.policy,
+        "no_repeat_days": args.no_repeat_days,
+        "batch_size": args.batch_size,
+        "optimize": not args.no_optimize,
+        "resume": args.resume,
+        "use_catalog": not args.no_catalog,
+        "accounts": args.accounts,
+        "max_concurrency": args.max_concurrency,
+        "performance_log": args.performance_log,
+    }
+
+def cmd_post(args):
+    if args.accounts and args.resume:
+        emit({"command": "post", "error": "--resume cannot be combined with --accounts"}, args.json)
+        return EXIT_USAGE
+    token = install_cancel_handlers()
+    result = post_job(args.folder, args.num_photos, post_options(args), cancel_token=token, catalog_path=args.catalog)
+    emit(result, args.json)
+    return result["exit_code"]
+
+def cmd_scan(args):
+    from photodedup import DuplicateIndex
+    folders = [os.path.abspath(f) for f in args.folders]
+    missing = [f for f in folders if not os.path.isdir(f)]
+    if missing:
+        emit({"command": "scan", "error": f"folder not found: {', '.join(missing)}"}, args.json)
+        return EXIT_USAGE
+
+    start = time.time()
+    catalog = open_catalog(args.catalog, folders)
+    try:
+        result = {"command": "scan", "folders": {}}
+        for folder in folders:
+            result["folders"][folder] = {"photos": len(catalog.photos_in_folder(folder))}
+        if args.duplicates:
+            groups = []
+            for folder in folders:
+                groups.extend(DuplicateIndex.from_catalog(catalog, folder).groups())
+            result["duplicate_groups"] = groups
+        result["duration"] = round(time.time() - start, 2)
+    finally:
+        catalog.close()
+    emit(result, args.json)
+    return EXIT_OK
+
+def cmd_weight(args):
+    paths = [os.path.abspath(p) for p in args.paths]
+    missing = [p for p in paths if not os.path.isfile(p)]
+    if missing:
+        emit({"command": "weight", "error": f"file not found: {', '.join(missing)}"}, args.json)
+        return EXIT_USAGE
+
+    catalog = open_catalog(args.catalog, sorted({os.path.dirname(p) for p in paths}))
+    try:
+        updated = catalog.set_weight(paths, args.weight)
+    finally:
+        catalog.close()
+    emit({"command": "weight", "weight": args.weight, "updated": updated}, args.json)
+    return EXIT_OK if updated == len(paths) else EXIT_FAILED
+
+def cmd_schedule(args):
+    from postscheduler import Scheduler, load_schedule
+    try:
+        jobs = load_schedule(args.config)
+    except (OSError, ValueError, KeyError) as e:
+        emit({"command": "schedule", "error": f"invalid schedule: {e}"}, args.json)
+        return EXIT_USAGE
+
+    from jobjournal import CancelToken
+    token = CancelToken()
+    sessions = {}
+    pools = {}
+
+    def run_job(job):
+        # One long-lived browser per profile, so later runs skip start-up and login
+        from webauto import BrowserSession
+        options = dict(job.options)
+        if options.get("accounts"):
+            return run_accounts_job(job, options)
+        key = (options.get("profile_dir"), options.get("headless", True), options.get("performance_log", False))
+        session = sessions.get(key)
+        if session is None:
+            session = sessions[key] = BrowserSession(profile_dir=key[0], headless=key[1], performance_log=key[2])
+        return post_job(job.folder, job.num_photos, options, session=session,
+                        cancel_token=token, catalog_path=args.catalog)
+
+    def run_accounts_job(job, options):
+        # Likewise one long-lived pool per accounts file
+        from accountpool import AccountPool, load_accounts
+        key = (os.path.abspath(options["accounts"]), options.get("max_concurrency") or DEFAULT_MAX_CONCURRENCY,
+               options.get("headless", True), options.get("performance_log", False))
+        pool = pools.get(key)
+        if pool is None:
+            try:
+                accounts = load_accounts(key[0])
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                return {"command": "post", "folder": job.folder, "error": f"invalid accounts: {e}",
+                        "exit_code": EXIT_USAGE}
+            pool = pools[key] = AccountPool(accounts, key[1], headless=key[2], performance_log=key[3])
+        return post_accounts_job(job.folder, job.num_photos, options, pool=pool,
+                                 cancel_token=token, catalog_path=args.catalog)
+
+    scheduler = Scheduler(jobs, run_job, state_path=args.state)
+    try:
+        if args.once:
+            signal.signal(signal.SIGINT, lambda *a: token.cancel())
+            signal.signal(signal.SIGTERM, lambda *a: token.cancel())
+            results = scheduler.run_due()
+            for result in results:
+                emit(result, args.json)
+            codes = [result.get("exit_code", EXIT_FAILED) for result in results]
+            return max(codes) if codes else EXIT_OK
+
+        def handle(signum, frame):
+            # Stop the running job and stop waiting for the next slot
+            print("Stopping the scheduler...", file=sys.stderr)
+            token.cancel()
+            scheduler.stop()
+
+        signal.signal(signal.SIGINT, handle)
+        signal.signal(signal.SIGTERM, handle)
+        scheduler.run_forever(lambda result: emit(result, args.json))
+        return EXIT_CANCELLED if token.cancelled else EXIT_OK
+    finally:
+        for session in sessions.values():
+            session.close()
+        for pool in pools.values():
+            pool.shutdown()
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--json", action="store_true", help="Print results as JSON lines")
+    common.add_argument("--catalog", help="Photo catalog database (default: the GUI's catalog)")
+
+    parser = argparse.ArgumentParser(prog="cli.py", description="Post photos to WhatsApp stories without the GUI.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    post = subparsers.add_parser("post", parents=[common], help="Post photos from a folder")
+    post.add_argument("folder")
+    post.add_argument("-n", "--num-photos", type=int, default=5)
+    post.add_argument("--policy", choices=POLICY_NAMES, default=DEFAULT_POLICY, help="How photos are picked")
+    post.add_argument("--no-repeat-days", type=float, help="Skip photos posted within this many days")
+    post.add_argument("--batch-size", type=int, default=10, help="Photos per composer round trip")
+    post.add_argument("--profile", help="Chrome profile directory (default: the GUI's profile)")
+    post.add_argument("--show-browser", action="store_true", help="Run Chrome with a window")
+    post.add_argument("--no-optimize", action="store_true", help="Upload the original files")
+    post.add_argument("--no-catalog", action="store_true", help="Do not read or record posting history")
+    post.add_argument("--resume", action="store_true", help="Finish the last interrupted job for this folder")
+    post.add_argument("--performance-log", action="store_true",
+                      help="Save Chrome's performance log next to the step traces")
+    post.add_argument("--accounts", help="JSON list of accounts to split the photos across (ignores --profile)")
+    post.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                      help="Accounts posting at the same time with --accounts")
+    post.set_defaults(func=cmd_post)
+
+    scan = subparsers.add_parser("scan", parents=[common], help="Update the catalog for folders and report them")
+    scan.add_argument("folders", nargs="+")
+    scan.add_argument("--duplicates", action="store_true", help="Also list groups of duplicate photos")
+    scan.set_defaults(func=cmd_scan)
+
+    weight = subparsers.add_parser("weight", parents=[common],
+                                   help="Set how often photos are picked by the weighted_manual policy")
+    weight.add_argument("weight", type=float, help="1 is normal, 2 twice as likely, 0 never")
+    weight.add_argument("paths", nargs="+")
+    weight.set_defaults(func=cmd_weight)
+
+    schedule = subparsers.add_parser("schedule", parents=[common], help="Run recurring jobs from a JSON schedule")
+    schedule.add_argument("config")
+    schedule.add_argument("--once", action="store_true", help="Run the jobs that are due and exit (for cron)")
+    schedule.add_argument("--state", help="File remembering when jobs last ran")
+    schedule.set_defaults(func=cmd_schedule)
+    return parser
+
+def main(argv=None):
+    global results_stream
+    args = build_parser().parse_args(argv)
+    results_stream = sys.stdout
+    # The poster and the catalog log progress with print(); keep stdout parseable
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            return args.func(args)
+        except Exception as e:
+            emit({"command": args.command, "error": f"{type(e).__name__}: {e}"}, args.json)
+            return EXIT_FAILED
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import uuid
+import threading
+from appdata import data_path
+
+def default_journal_dir():
+    """Return the per-user directory holding posting job journals."""
+    return data_path("jobs")
+
+class JobCancelled(Exception):
+    """Raised at a step boundary once a job's CancelToken has been cancelled."""
+
+class CancelToken:
+    """Cooperative cancellation flag shared between the UI and a posting job."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        """Ask the job to stop at its next step boundary."""
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        """Raise JobCancelled if cancel() has been called."""
+        if self._event.is_set():
+            raise JobCancelled()
+
+class JobJournal:
+    """
+    Append-only on-disk record of one posting job.
+
+    Each line is a JSON event: the job's photo list when it is created, state
+    changes, and every photo that was posted, failed or skipped. Lines are flushed and
+    fsynced as they are written, so after a crash or cancellation the journal
+    is replayed and the job resumes with the photos that were not posted yet.
+    A completed job has nothing left to resume, so its journal is deleted;
+    only open jobs stay on disk for find_resumable() to replay.
+    """
+
+    CREATED = "created"
+    RUNNING = "running"
+    CANCELLED = "cancelled"
+    INCOMPLETE = "incomplete"
+    COMPLETED = "completed"
+
+    # A job in one of these states can be picked up again
+    RESUMABLE_STATES = (CREATED, RUNNING, CANCELLED, INCOMPLETE)
+
+    def __init__(self, path):
+        self.path = path
+        self.job_id = os.path.splitext(os.path.basename(path))[0]
+        self.photo_directory = None
+        self.photos = []
+        self.posted = set()
+        self.failed = {}
+        self.skipped = set()
+        self.state = None
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._replay()
+
+    @classmethod
+    def create(cls, photo_directory, photos, journal_dir=None):
+        """Start a new journal for posting photos from photo_directory."""
+        journal_dir = journal_dir or default_journal_dir()
+        os.makedirs(journal_dir, exist_ok=True)
+        job_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:8]
+        journal = cls(os.path.join(journal_dir, job_id + ".jsonl"))
+        journal.photo_directory = os.path.abspath(photo_directory)
+        journal.photos = list(photos)
+        journal._append({"event": "created", "photo_directory": journal.photo_directory, "photos": journal.photos})
+        journal.state = cls.CREATED
+        return journal
+
+    @classmethod
+    def find_resumable(cls, photo_directory, journal_dir=None):
+        """Return the newest unfinished journal for photo_directory, or None."""
+        journal_dir = journal_dir or default_journal_dir()
+        try:
+            names = sorted((n for n in os.listdir(journal_dir) if n.endswith(".jsonl")), reverse=True)
+        except OSError:
+            return None
+        photo_directory = os.path.abspath(photo_directory)
+        for name in names:
+            journal = cls(os.path.join(journal_dir, name))
+            if journal.state == cls.COMPLETED:
+                # Left behind by a version that kept completed journals
+                journal._discard()
+                continue
+            if journal.photo_directory != photo_directory:
+                continue
+            if journal.state in cls.RESUMABLE_STATES and journal.remaining():
+                return journal
+        return None
+
+    def _replay(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash mid-write
+                    continue
+                kind = event.get("event")
+                if kind == "created":
+                    self.photo_directory = event["photo_directory"]
+                    self.photos = event["photos"]
+                    self.state = self.CREATED
+                elif kind == "state":
+                    self.state = event["state"]
+                elif kind == "posted":
+                    self.posted.update(event["photos"])
+                    for photo in event["photos"]:
+                        self.failed.pop(photo, None)
+                elif kind == "failed":
+                    self.failed[event["photo"]] = event.get("error")
+                elif kind == "skipped":
+                    self.skipped.add(event["photo"])
+
+    def _append(self, event):
+        event["ts"] = time.time()
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def set_state(self, state):
+        """Record a state change."""
+        self.state = state
+        self._append({"event": "state", "state": state})
+
+    def record_posted(self, photos):
+        """Record that photos were posted."""
+        photos = list(photos)
+        self.posted.update(photos)
+        self._append({"event": "posted", "photos": photos})
+
+    def record_failed(self, photo, error):
+        """Record that posting photo failed; it is retried when the job resumes."""
+        self.failed[photo] = str(error)
+        self._append({"event": "failed", "photo": photo, "error": str(error)})
+
+    def record_skipped(self, photo, error):
+        """Record that photo is unusable (missing or unreadable); it is not retried."""
+        self.skipped.add(photo)
+        self._append({"event": "skipped", "photo": photo, "error": str(error)})
+
+    def remaining(self):
+        """Return the photos neither posted nor skipped yet, in their original order."""
+        return [photo for photo in self.photos if photo not in self.posted and photo not in self.skipped]
+
+    def finish(self):
+        """Record the final state depending on whether every photo was posted; a completed journal is deleted."""
+        if self.remaining():
+            self.set_state(self.INCOMPLETE)
+        else:
+            self.state = self.COMPLETED
+            self._discard()
+
+    def _discard(self):
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
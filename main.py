@@ -1,24 +1,78 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
-import shutil
 import threading
 import sys
-from PIL import Image, ImageTk, ImageDraw, ImageFont
-import random
+import json
+import time
+import multiprocessing
+from PIL import Image, ImageTk
+import bisect
+from collections import OrderedDict
+from thumbcache import ThumbnailCache, ThumbnailLoader, PreviewCache
+from photowatch import PhotoLibraryIndex
+from photolibrary import PhotoCatalog
+from photoimport import BulkImporter, IMPORTED, DUPLICATE, SIMILAR
+from storyselect import (
+    DEFAULT_POLICY, POLICY_RANDOM, POLICY_LEAST_RECENT, POLICY_WEIGHTED_AGE, POLICY_WEIGHTED_MANUAL
+)
+from jobjournal import CancelToken, JobJournal
+from progress import ProgressChannel, ProgressTracker
 
-# Import the story poster script
-# Assuming the script is named 'whatsapp_story_poster.py'
-# and is in the same directory
-try:
-    from whatsapp_story_poster import post_whatsapp_stories
-except ImportError:
-    # Fallback function if import fails
-    def post_whatsapp_stories(photo_directory, num_photos, headless=False):
-        print(f"Would post {num_photos} photos from {photo_directory} (Headless: {headless})")
+# The story poster (webauto.py in the same directory) pulls in selenium, the
+# slowest import of the app, so load_poster() imports it once posting starts
+post_whatsapp_stories = None
+BrowserSession = None
+ON_FINISH_RELEASE, ON_FINISH_CLOSE = "release", "close"  # Same values as in webauto
+
+# Set by startupbench.py: write start-up timings to this file, then quit
+STARTUP_PROBE_ENV = "STORY_POSTER_STARTUP_PROBE"
+
+def load_poster():
+    """Import the story poster on first use; fall back to a dry run if it cannot be imported."""
+    global post_whatsapp_stories, BrowserSession
+    if post_whatsapp_stories is not None:
+        return
+    try:
+        import webauto
+    except ImportError:
+        # Fallback function if import fails
+        def fallback(photo_directory, num_photos, headless=False, photo_index=None, catalog=None,
+                     session=None, cancel_token=None, journal=None, on_finish=None,
+                     progress_channel=None, selection_policy=None, no_repeat_days=None):
+            print(f"Would post {num_photos} photos from {photo_directory} (Headless: {headless})")
+            return
+        post_whatsapp_stories = fallback
         return
+    BrowserSession = webauto.BrowserSession
+    post_whatsapp_stories = webauto.post_whatsapp_stories
 
 class WhatsAppStoryPosterUI:
+    # Thumbnail grid geometry
+    THUMBNAIL_SIZE = 120
+    GRID_MARGIN = 10
+    CELL_WIDTH = 140
+    CELL_HEIGHT = 170
+    MAX_THUMBNAIL_IMAGES = 500
+    # How often posting and import progress is pulled into the UI
+    PROGRESS_INTERVAL_MS = 250
+    IMPORT_INTERVAL_MS = 100
+    # Selection policies as shown in the settings
+    POLICY_LABELS = {
+        POLICY_WEIGHTED_AGE: "Uzun süredir paylaşılmayanlar öncelikli",
+        POLICY_LEAST_RECENT: "En eski paylaşılan önce",
+        POLICY_WEIGHTED_MANUAL: "Ağırlığa göre rastgele",
+        POLICY_RANDOM: "Tamamen rastgele",
+    }
+    # Manual weights offered in the thumbnail menu (used by the weighted policies)
+    WEIGHT_CHOICES = [
+        (0.0, "Hiç seçme"),
+        (0.5, "Seyrek seç"),
+        (1.0, "Normal"),
+        (2.0, "Sık seç"),
+        (4.0, "Çok sık seç"),
+    ]
+    
     def __init__(self, root):
         self.root = root
         self.root.title("WhatsApp Hikaye Gönderici")
@@ -39,23 +93,55 @@ class WhatsAppStoryPosterUI:
         self.current_folder = self.photos_dir
         self.ensure_folder_exists(self.photos_dir)
         
+        # Live index of photos_dir; the grid, folder list and poster all read from it.
+        # It starts empty and is filled by load_library() once the window is up.
+        self.photo_index = PhotoLibraryIndex(self.photos_dir, scan=False)
+        self.library_ready = False
+        
+        # SQLite catalog with metadata and post history, opened by load_library()
+        self.catalog = None
+        self.catalog_error = None  # Kept in the status bar while the catalog is unusable
+        
         self.folders = self.get_subfolders()
         self.image_files = []
-        self.thumbnails = {}
+        self.thumbnails = OrderedDict()  # Bounded LRU of PhotoImages
+        self.thumbnail_errors = set()
+        self.grid_cells = []
+        self.visible_cells = {}
         self.selected_image = None
+        self.thumbnail_cache = ThumbnailCache()
+        self.thumbnail_loader = ThumbnailLoader(self.root, self.thumbnail_cache)
+        self.preview_cache = PreviewCache()
+        self.preview_retry = None
         
         # UI variables
         self.num_photos_var = tk.IntVar(value=5)
+        self.headless_var = tk.BooleanVar(value=False)
+        self.close_browser_var = tk.BooleanVar(value=False)
+        self.policy_var = tk.StringVar(value=self.POLICY_LABELS[DEFAULT_POLICY])
+        self.no_repeat_days_var = tk.IntVar(value=0)
         self.status_var = tk.StringVar(value="Hazır")
         self.running = False
         self.running_thread = None
+        self.browser_session = None  # Reused across posting runs
+        self.cancel_token = None  # Cancels the running posting job
+        self.progress_channel = None  # Progress events from the running job
+        self.progress_tracker = None
+        self.progress_text_var = tk.StringVar(value="")
+        self.importer = None  # BulkImporter of the running photo import
+        self.import_similar_asked = False
+        
+        # Close the shared browser together with the window
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Create UI
         self.create_menu()
         self.create_main_layout()
         
-        # Load initial images
-        self.load_images_from_folder()
+        # Scan the library and open the catalog off the Tk thread, so the
+        # window paints right away with an empty grid that fills in afterwards
+        self.status_var.set("Fotoğraflar yükleniyor...")
+        threading.Thread(target=self.load_library, name="library-loader", daemon=True).start()
     
     def ensure_folder_exists(self, folder_path):
         """Ensure the specified folder exists."""
@@ -68,10 +154,7 @@ class WhatsAppStoryPosterUI:
             return []
         
         folders = ["Varsayılan (pictures)"]
-        for item in os.listdir(self.photos_dir):
-            full_path = os.path.join(self.photos_dir, item)
-            if os.path.isdir(full_path):
-                folders.append(item)
+        folders.extend(self.photo_index.subfolders())
         
         return folders
     
@@ -84,7 +167,7 @@ class WhatsAppStoryPosterUI:
         file_menu.add_command(label="Fotoğraf Ekle", command=self.add_photos)
         file_menu.add_command(label="Yeni Klasör", command=self.create_new_folder)
         file_menu.add_separator()
-        file_menu.add_command(label="Çıkış", command=self.root.quit)
+        file_menu.add_command(label="Çıkış", command=self.on_close)
         menubar.add_cascade(label="Dosya", menu=file_menu)
         
         # Edit menu
@@ -182,8 +265,21 @@ class WhatsAppStoryPosterUI:
         settings_frame = ttk.LabelFrame(right_panel, text="Ayarlar", padding="10")
         settings_frame.pack(fill=tk.X, pady=(0, 10))
         
-        # Random selection info
-        ttk.Label(settings_frame, text="Not: Fotoğraflar mevcut klasörden\nrastgele seçilecektir.", style="Header.TLabel").pack(pady=5)
+        # How photos are picked from the current folder
+        ttk.Label(settings_frame, text="Fotoğraf seçimi:").pack(anchor=tk.W)
+        ttk.Combobox(
+            settings_frame, textvariable=self.policy_var, values=list(self.POLICY_LABELS.values()), state="readonly"
+        ).pack(fill=tk.X, pady=(0, 5))
+        
+        no_repeat_frame = ttk.Frame(settings_frame)
+        no_repeat_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(no_repeat_frame, text="Son kaç günde paylaşılanlar atlansın:").pack(side=tk.LEFT)
+        ttk.Spinbox(no_repeat_frame, from_=0, to=365, textvariable=self.no_repeat_days_var, width=5).pack(side=tk.RIGHT)
+        
+        # Headless only works once the browser profile is logged in (no QR code to scan)
+        ttk.Checkbutton(settings_frame, text="Tarayıcıyı gizli çalıştır (headless)", variable=self.headless_var).pack(anchor=tk.W)
+        # Otherwise the browser stays open and the next run skips start-up and login
+        ttk.Checkbutton(settings_frame, text="İş bitince tarayıcıyı kapat", variable=self.close_browser_var).pack(anchor=tk.W)
         
         # Controls
         controls_frame = ttk.LabelFrame(right_panel, text="Kontroller", padding="10")
@@ -202,6 +298,10 @@ class WhatsAppStoryPosterUI:
         self.status_label = ttk.Label(status_frame, textvariable=self.status_var, wraplength=250, style="Header.TLabel")
         self.status_label.pack(fill=tk.X)
         
+        self.progress_bar = ttk.Progressbar(status_frame, mode="determinate")
+        self.progress_bar.pack(fill=tk.X, pady=(8, 2))
+        ttk.Label(status_frame, textvariable=self.progress_text_var, wraplength=250).pack(fill=tk.X)
+        
     def create_image_list(self, parent):
         """Create the image list frame with thumbnails."""
         # Create frame for image list
@@ -213,13 +313,14 @@ class WhatsAppStoryPosterUI:
         canvas_frame.pack(fill=tk.BOTH, expand=True)
         
         self.canvas = tk.Canvas(canvas_frame, highlightthickness=0)
-        scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=self.canvas.yview)
+        scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=self.on_scrollbar)
         self.canvas.configure(yscrollcommand=scrollbar.set)
         
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
-        # Create a frame inside the canvas to hold the thumbnails
+        # Frame inside the canvas for the empty-folder message; the thumbnails
+        # themselves are a small pool of cells placed directly on the canvas
         self.thumbnails_frame = ttk.Frame(self.canvas)
         self.canvas_window = self.canvas.create_window((0, 0), window=self.thumbnails_frame, anchor=tk.NW)
         
@@ -238,95 +339,312 @@ class WhatsAppStoryPosterUI:
     
     def on_frame_configure(self, event):
         """Reset the scroll region to encompass the inner frame."""
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        # With images present the scroll region is owned by the virtual grid
+        if not self.image_files:
+            self.canvas.configure(scrollregion=self.canvas.bbox("all"))
     
     def on_canvas_configure(self, event):
         """When the canvas is resized, resize the inner frame to match."""
         canvas_width = event.width
         self.canvas.itemconfig(self.canvas_window, width=canvas_width)
+        self.update_visible_rows()
     
     def on_mousewheel(self, event):
         """Handle mousewheel scrolling."""
         self.canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
+        self.update_visible_rows()
+    
+    def on_scrollbar(self, *args):
+        """Scroll the canvas from the scrollbar and refresh the visible rows."""
+        self.canvas.yview(*args)
+        self.update_visible_rows()
+    
+    def create_grid_cell(self):
+        """Create one reusable thumbnail cell on the canvas."""
+        frame = ttk.Frame(self.canvas, padding=5)
+        
+        image_label = ttk.Label(frame, text="...", width=14, anchor=tk.CENTER, cursor="hand2")
+        image_label.pack()
+        
+        name_label = ttk.Label(frame, wraplength=self.THUMBNAIL_SIZE)
+        name_label.pack()
+        
+        cell = {
+            "frame": frame,
+            "image_label": image_label,
+            "name_label": name_label,
+            "window": self.canvas.create_window((0, 0), window=frame, anchor=tk.NW, state="hidden"),
+            "path": None,
+        }
+        
+        # The click handler looks up whatever photo the cell is showing right now
+        image_label.bind("<Button-1>", lambda e, c=cell: c["path"] and self.on_thumbnail_click(c["path"]))
+        # Right click (Button-2 on macOS) opens the weight menu
+        for button in ("<Button-3>", "<Button-2>"):
+            image_label.bind(button, lambda e, c=cell: c["path"] and self.show_weight_menu(e, c["path"]))
+        return cell
+    
+    def show_weight_menu(self, event, file_path):
+        """Offer the manual selection weights for one photo."""
+        if self.catalog is None:
+            self.status_var.set("Katalog hâlâ yükleniyor, ağırlık henüz ayarlanamaz.")
+            return
+        current = self.catalog.get_weight(file_path)
+        menu = tk.Menu(self.root, tearoff=0)
+        for weight, label in self.WEIGHT_CHOICES:
+            menu.add_command(
+                label=f"{'✓ ' if current == weight else ''}{label} ({weight:g})",
+                command=lambda w=weight: self.set_photo_weight(file_path, w)
+            )
+        try:
+            menu.tk_popup(event.x_root, event.y_root)
+        finally:
+            menu.grab_release()
+    
+    def set_photo_weight(self, file_path, weight):
+        """Store a photo's manual selection weight in the catalog."""
+        filename = os.path.basename(file_path)
+        if self.catalog.set_weight([file_path], weight):
+            self.status_var.set(f"{filename} ağırlığı {weight:g} olarak ayarlandı")
+        else:
+            self.status_var.set(f"{filename} henüz kataloğa eklenmedi, lütfen biraz sonra tekrar deneyin.")
+    
+    def show_in_cell(self, cell, file_path):
+        """Point a pooled cell at a different photo."""
+        cell["path"] = file_path
+        
+        filename = os.path.basename(file_path)
+        short_name = filename[:15] + "..." if len(filename) > 15 else filename
+        cell["name_label"].configure(text=short_name)
+        
+        photo = self.thumbnails.get(file_path)
+        if photo is not None:
+            self.thumbnails.move_to_end(file_path)
+            cell["image_label"].configure(image=photo, text="", width=0)
+        elif file_path in self.thumbnail_errors:
+            cell["image_label"].configure(image="", text=f"Hata\n{filename}", width=14)
+        else:
+            cell["image_label"].configure(image="", text="...", width=14)
+        cell["image_label"].image = photo  # Keep a reference while shown
+    
+    def update_visible_rows(self):
+        """Lay out pooled cells for the rows in (and just around) the viewport."""
+        if not self.image_files:
+            return
+        
+        canvas_width = self.canvas.winfo_width()
+        canvas_height = self.canvas.winfo_height()
+        columns = max(1, (canvas_width - self.GRID_MARGIN) // self.CELL_WIDTH)
+        total_rows = (len(self.image_files) + columns - 1) // columns
+        self.canvas.configure(scrollregion=(0, 0, canvas_width, total_rows * self.CELL_HEIGHT + self.GRID_MARGIN))
+        
+        # One extra row above and below keeps scrolling from showing gaps
+        top = self.canvas.canvasy(0)
+        first_row = max(0, int(top // self.CELL_HEIGHT) - 1)
+        last_row = min(total_rows - 1, int((top + canvas_height) // self.CELL_HEIGHT) + 1)
+        first = first_row * columns
+        last = min(len(self.image_files), (last_row + 1) * columns)
+        
+        while len(self.grid_cells) < last - first:
+            self.grid_cells.append(self.create_grid_cell())
+        
+        # Index modulo pool size keeps a photo in the same cell while it stays on screen
+        self.visible_cells = {}
+        used = set()
+        for i in range(first, last):
+            cell = self.grid_cells[i % len(self.grid_cells)]
+            used.add(id(cell))
+            file_path = self.image_files[i]
+            if cell["path"] != file_path:
+                self.show_in_cell(cell, file_path)
+            self.visible_cells[file_path] = cell
+            
+            row, col = divmod(i, columns)
+            self.canvas.coords(cell["window"], self.GRID_MARGIN + col * self.CELL_WIDTH, row * self.CELL_HEIGHT)
+            self.canvas.itemconfigure(cell["window"], state="normal")
+        
+        for cell in self.grid_cells:
+            if id(cell) not in used:
+                self.canvas.itemconfigure(cell["window"], state="hidden")
+                cell["path"] = None
+        
+        # Only decode what is on screen; anything scrolled away is dropped from the queue
+        missing = [
+            path for path in self.image_files[first:last]
+            if path not in self.thumbnails and path not in self.thumbnail_errors
+        ]
+        self.thumbnail_loader.request(missing)
     
     def load_images_from_folder(self):
         """Load and display image thumbnails from the current folder."""
-        # Clear existing thumbnails
+        # Cancel any thumbnails still being decoded for the previous folder
+        self.thumbnail_loader.cancel()
+        
+        # Clear the empty-folder message and release the pooled cells
         for widget in self.thumbnails_frame.winfo_children():
             widget.destroy()
+        for cell in self.grid_cells:
+            self.canvas.itemconfigure(cell["window"], state="hidden")
+            cell["path"] = None
         
         self.image_files = []
-        self.thumbnails = {}
+        self.thumbnails = OrderedDict()
+        self.thumbnail_errors = set()
+        self.visible_cells = {}
+        self.thumbnail_cache.reset_stats()
         
-        # Get image files from folder
-        valid_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp']
-        if os.path.exists(self.current_folder):
-            for filename in os.listdir(self.current_folder):
-                file_path = os.path.join(self.current_folder, filename)
-                if os.path.isfile(file_path) and any(filename.lower().endswith(ext) for ext in valid_extensions):
-                    self.image_files.append(file_path)
+        # Get image files from folder, sorted so later changes can be merged in place
+        self.image_files = self.list_image_files(self.current_folder)
         
         # Display thumbnails
         if not self.image_files:
-            no_images_label = ttk.Label(
-                self.thumbnails_frame, 
-                text="Bu klasörde hiç fotoğraf yok.\n'FOTOĞRAF EKLE' düğmesine tıklayarak fotoğraf ekleyebilirsiniz.",
-                wraplength=300,
-                style="Header.TLabel"
-            )
-            no_images_label.pack(pady=20)
-            
-            # Add a big add photos button in the center
-            add_btn = ttk.Button(
-                self.thumbnails_frame, 
-                text="FOTOĞRAF EKLE", 
-                command=self.add_photos,
-                style="Large.TButton"
-            )
-            add_btn.pack(pady=10, ipadx=20, ipady=10)
+            self.show_empty_folder_message()
             return
         
-        # Calculate layout
-        canvas_width = self.canvas.winfo_width()
-        thumbnail_size = 120
-        margin = 10
-        columns = max(1, (canvas_width - margin) // (thumbnail_size + margin))
-        
-        # Create thumbnail widgets
-        for i, file_path in enumerate(self.image_files):
-            row = i // columns
-            col = i % columns
-            
-            frame = ttk.Frame(self.thumbnails_frame, padding=5)
-            frame.grid(row=row, column=col, padx=5, pady=5)
-            
-            # Create thumbnail
-            try:
-                img = Image.open(file_path)
-                img.thumbnail((thumbnail_size, thumbnail_size))
-                
-                # Add a light border
-                img_with_border = Image.new("RGB", (img.width + 2, img.height + 2), "#DDDDDD")
-                img_with_border.paste(img, (1, 1))
-                
-                photo = ImageTk.PhotoImage(img_with_border)
-                self.thumbnails[file_path] = photo  # Keep a reference
-                
-                # Add thumbnail label
-                label = ttk.Label(frame, image=photo, cursor="hand2")
-                label.image = photo
-                label.pack()
-                
-                # Add filename label
-                filename = os.path.basename(file_path)
-                short_name = filename[:15] + "..." if len(filename) > 15 else filename
-                name_label = ttk.Label(frame, text=short_name, wraplength=thumbnail_size)
-                name_label.pack()
-                
-                # Bind click event
-                label.bind("<Button-1>", lambda e, path=file_path: self.on_thumbnail_click(path))
-            except Exception as e:
-                ttk.Label(frame, text=f"Hata\n{os.path.basename(file_path)}").pack()
+        # Thumbnails arrive as the workers finish; only visible rows get cells
+        self.thumbnails_frame.configure(height=1)
+        self.canvas.yview_moveto(0)
+        self.thumbnail_loader.load([], self.on_thumbnail_ready, self.on_thumbnails_loaded)
+        self.update_visible_rows()
+    
+    def load_library(self):
+        """Scan the photo library and open the catalog (runs on a background thread)."""
+        self.photo_index.rescan()
+        
+        # Opening is quick; the slow catalog sync runs after the grid is shown
+        try:
+            catalog = PhotoCatalog()
+        except Exception as e:
+            catalog = None
+            self.catalog_error = f"Katalog açılamadı, gönderim geçmişi kullanılamıyor: {e}"
+        if catalog is not None:
+            self.photo_index.add_listener(catalog.apply_changes)
+            self.catalog = catalog
+        self.root.after(0, self.on_library_loaded)
+        
+        self.photo_index.start()
+        if catalog is None:
+            return
+        try:
+            catalog.sync_library(self.photo_index)
+        except Exception as e:
+            self.catalog_error = f"Katalog güncellenemedi: {e}"
+            self.root.after(0, self.status_var.set, self.catalog_error)
+    
+    def on_library_loaded(self):
+        """Show the scanned library; later changes arrive through on_library_changed."""
+        self.library_ready = True
+        self.photo_index.add_listener(self.on_library_changed)
+        self.folders = self.get_subfolders()
+        self.folder_combobox['values'] = self.folders
+        self.status_var.set(self.catalog_error or "Hazır")
+        self.load_images_from_folder()
+    
+    def list_image_files(self, folder):
+        """Return the sorted paths of all images directly inside folder."""
+        return self.photo_index.photos(folder)
+    
+    def show_empty_folder_message(self):
+        """Show the 'no photos' message and add button in place of the grid."""
+        no_images_label = ttk.Label(
+            self.thumbnails_frame, 
+            text="Bu klasörde hiç fotoğraf yok.\n'FOTOĞRAF EKLE' düğmesine tıklayarak fotoğraf ekleyebilirsiniz.",
+            wraplength=300,
+            style="Header.TLabel"
+        )
+        no_images_label.pack(pady=20)
+        
+        # Add a big add photos button in the center
+        add_btn = ttk.Button(
+            self.thumbnails_frame, 
+            text="FOTOĞRAF EKLE", 
+            command=self.add_photos,
+            style="Large.TButton"
+        )
+        add_btn.pack(pady=10, ipadx=20, ipady=10)
+    
+    def on_library_changed(self, folder, added, removed):
+        """Called from the watcher thread when the photo index changes."""
+        self.root.after(0, lambda: self.apply_library_change(folder, added, removed))
+    
+    def apply_library_change(self, folder, added, removed):
+        """Reflect a photo index change in the grid and the folder list."""
+        if folder == self.current_folder:
+            self.apply_folder_changes(added=added, removed=removed)
+        
+        if os.path.dirname(folder) == self.photos_dir:
+            folders = self.get_subfolders()
+            if folders != self.folders:
+                self.folders = folders
+                self.folder_combobox['values'] = self.folders
+    
+    def apply_folder_changes(self, added=(), removed=()):
+        """
+        Insert and remove individual photos without rebuilding the grid.
+        
+        Only the cells currently on screen are rebound afterwards, so the cost
+        depends on the number of changed files rather than the folder size.
+        """
+        was_empty = not self.image_files
+        
+        for file_path in removed:
+            index = bisect.bisect_left(self.image_files, file_path)
+            if index < len(self.image_files) and self.image_files[index] == file_path:
+                del self.image_files[index]
+            self.thumbnails.pop(file_path, None)
+            self.thumbnail_errors.discard(file_path)
+            if self.selected_image == file_path:
+                self.selected_image = None
+        
+        for file_path in added:
+            index = bisect.bisect_left(self.image_files, file_path)
+            if index == len(self.image_files) or self.image_files[index] != file_path:
+                self.image_files.insert(index, file_path)
+        
+        if not self.image_files:
+            if not was_empty:
+                for cell in self.grid_cells:
+                    self.canvas.itemconfigure(cell["window"], state="hidden")
+                    cell["path"] = None
+                self.visible_cells = {}
+                self.show_empty_folder_message()
+            return
+        
+        if was_empty:
+            # Replace the empty-folder message with the grid
+            for widget in self.thumbnails_frame.winfo_children():
+                widget.destroy()
+            self.thumbnails_frame.configure(height=1)
+            self.thumbnail_loader.load([], self.on_thumbnail_ready, self.on_thumbnails_loaded)
+        
+        self.update_visible_rows()
+    
+    def on_thumbnail_ready(self, file_path, img, error):
+        """Cache a decoded thumbnail and place it into its cell if it is on screen."""
+        if error is not None:
+            self.thumbnail_errors.add(file_path)
+            cell = self.visible_cells.get(file_path)
+            if cell is not None:
+                cell["image_label"].configure(text=f"Hata\n{os.path.basename(file_path)}")
+            return
+        
+        # Add a light border
+        img_with_border = Image.new("RGB", (img.width + 2, img.height + 2), "#DDDDDD")
+        img_with_border.paste(img, (1, 1))
+        
+        photo = ImageTk.PhotoImage(img_with_border)
+        self.thumbnails[file_path] = photo  # Keep a reference
+        while len(self.thumbnails) > self.MAX_THUMBNAIL_IMAGES:
+            self.thumbnails.popitem(last=False)
+        
+        cell = self.visible_cells.get(file_path)
+        if cell is not None:
+            cell["image_label"].configure(image=photo, text="", width=0)
+            cell["image_label"].image = photo
+    
+    def on_thumbnails_loaded(self):
+        """Report thumbnail cache hit/miss counts once a batch is complete."""
+        self.status_var.set(self.catalog_error or self.thumbnail_cache.stats_text())
     
     def on_thumbnail_click(self, file_path):
         """Handle thumbnail click event to show preview."""
@@ -337,25 +655,23 @@ class WhatsAppStoryPosterUI:
         """Show larger preview of the selected image."""
         # Clear the canvas
         self.preview_canvas.delete("all")
+        if self.preview_retry is not None:
+            self.preview_canvas.after_cancel(self.preview_retry)
+            self.preview_retry = None
+        
+        canvas_width = self.preview_canvas.winfo_width()
+        canvas_height = self.preview_canvas.winfo_height()
+        
+        # Skip if canvas size is not yet determined (without touching the file)
+        if canvas_width <= 1 or canvas_height <= 1:
+            self.preview_retry = self.preview_canvas.after(100, lambda: self.show_preview(file_path))
+            return
         
         try:
-            # Open and resize image for preview
-            img = Image.open(file_path)
-            canvas_width = self.preview_canvas.winfo_width()
-            canvas_height = self.preview_canvas.winfo_height()
-            
-            # Skip if canvas size is not yet determined
-            if canvas_width <= 1 or canvas_height <= 1:
-                self.preview_canvas.after(100, lambda: self.show_preview(file_path))
-                return
-            
-            # Resize image while maintaining aspect ratio
-            img_width, img_height = img.size
-            ratio = min(canvas_width / img_width, canvas_height / img_height)
-            new_width = int(img_width * ratio)
-            new_height = int(img_height * ratio)
+            # Decoded at reduced resolution and cached by path and canvas size
+            img = self.preview_cache.get(file_path, canvas_width, canvas_height)
+            new_width, new_height = img.size
             
-            img = img.resize((new_width, new_height), Image.LANCZOS)
             photo = ImageTk.PhotoImage(img)
             
             # Keep a reference to prevent garbage collection
@@ -374,6 +690,9 @@ class WhatsAppStoryPosterUI:
                 text=filename,
                 fill="black"
             )
+            
+            # Warm the cache for the photos next to this one
+            self.preview_cache.prefetch(self.neighbour_files(file_path), canvas_width, canvas_height)
         except Exception as e:
             # Show error message
             self.preview_canvas.create_text(
@@ -383,8 +702,24 @@ class WhatsAppStoryPosterUI:
                 fill="red"
             )
     
+    def neighbour_files(self, file_path, distance=2):
+        """Return the photos up to distance positions before and after file_path in the grid."""
+        index = bisect.bisect_left(self.image_files, file_path)
+        if index == len(self.image_files) or self.image_files[index] != file_path:
+            return []
+        neighbours = []
+        for offset in range(1, distance + 1):
+            for i in (index + offset, index - offset):
+                if 0 <= i < len(self.image_files):
+                    neighbours.append(self.image_files[i])
+        return neighbours
+    
     def add_photos(self):
         """Open file dialog to add photos to the current folder."""
+        if self.importer is not None:
+            messagebox.showinfo("İçe Aktarma Sürüyor", "Önceki fotoğraflar hâlâ ekleniyor. Lütfen bekleyin.")
+            return
+        
         filetypes = [
             ("Fotoğraf dosyaları", "*.jpg *.jpeg *.png *.gif *.bmp"),
             ("JPEG dosyaları", "*.jpg *.jpeg"),
@@ -403,29 +738,69 @@ class WhatsAppStoryPosterUI:
         # Ensure destination folder exists
         self.ensure_folder_exists(self.current_folder)
         
-        # Copy files to the current folder
-        copied_count = 0
-        for src_path in filenames:
-            try:
-                filename = os.path.basename(src_path)
-                dest_path = os.path.join(self.current_folder, filename)
-                
-                # Check if file already exists
-                if os.path.exists(dest_path):
-                    # Add a suffix to avoid overwriting
-                    base, ext = os.path.splitext(filename)
-                    dest_path = os.path.join(self.current_folder, f"{base}_{random.randint(1000, 9999)}{ext}")
-                
-                shutil.copy2(src_path, dest_path)
-                copied_count += 1
-            except Exception as e:
-                messagebox.showerror("Hata", f"{src_path} kopyalanırken hata oluştu:\n{str(e)}")
+        # Copy, link or clone the files on worker threads; poll_import() adds
+        # them to the grid as they land and reports once at the end
+        self.importer = BulkImporter(self.current_folder, catalog=self.catalog)
+        self.importer.start(filenames)
+        self.status_var.set(f"{len(filenames)} fotoğraf içe aktarılıyor...")
+        self.root.after(self.IMPORT_INTERVAL_MS, self.poll_import)
+    
+    def poll_import(self):
+        """Add the photos imported since the last tick to the grid and update the import status."""
+        importer = self.importer
+        if importer is None:
+            return
+        added = [result.dest for result in importer.drain() if result.outcome == IMPORTED]
+        if added and importer.dest_folder == self.current_folder:
+            self.apply_folder_changes(added=added)
         
-        # Reload the images
-        self.load_images_from_folder()
+        if not importer.finished:
+            self.status_var.set(f"İçe aktarılıyor: {importer.processed}/{importer.total}")
+            self.root.after(self.IMPORT_INTERVAL_MS, self.poll_import)
+            return
+        
+        # Look-alikes of library photos are held back; the user decides once for all of them
+        counts, _, _ = importer.summary()
+        if counts[SIMILAR] and not self.import_similar_asked:
+            self.import_similar_asked = True
+            example = next(result for result in importer.results if result.outcome == SIMILAR)
+            if messagebox.askyesno(
+                "Benzer Fotoğraflar",
+                f"{counts[SIMILAR]} fotoğraf kütüphanedeki fotoğraflara çok benziyor "
+                f"(örn. {os.path.basename(example.source)} ↔ {os.path.basename(example.match)}).\n\n"
+                f"Bunlar da eklensin mi?"
+            ):
+                importer.import_similar()
+                self.root.after(self.IMPORT_INTERVAL_MS, self.poll_import)
+                return
         
-        if copied_count > 0:
-            self.status_var.set(f"{copied_count} fotoğraf {os.path.basename(self.current_folder)} klasörüne eklendi")
+        self.finish_import()
+    
+    def finish_import(self):
+        """Show one summary of the finished import."""
+        importer = self.importer
+        self.importer = None
+        self.import_similar_asked = False
+        importer.executor.shutdown(wait=False)
+        
+        counts, methods, failures = importer.summary()
+        message = f"{counts[IMPORTED]} fotoğraf {os.path.basename(importer.dest_folder)} klasörüne eklendi"
+        if counts[DUPLICATE]:
+            message += f", {counts[DUPLICATE]} kopya atlandı"
+        if counts[SIMILAR]:
+            message += f", {counts[SIMILAR]} benzer fotoğraf eklenmedi"
+        if failures:
+            message += f", {len(failures)} hata"
+        self.status_var.set(message)
+        
+        if failures:
+            lines = [f"{os.path.basename(source)}: {error}" for source, error in failures[:10]]
+            if len(failures) > 10:
+                lines.append(f"... ve {len(failures) - 10} dosya daha")
+            messagebox.showerror(
+                "İçe Aktarma Hataları",
+                f"{len(failures)} fotoğraf eklenemedi:\n\n" + "\n".join(lines)
+            )
     
     def remove_selected(self):
         """Remove the selected image from the folder."""
@@ -444,8 +819,8 @@ class WhatsAppStoryPosterUI:
                 os.remove(file_to_remove)
                 self.selected_image = None
                 
-                # Reload the images
-                self.load_images_from_folder()
+                # Drop just this photo from the grid
+                self.apply_folder_changes(removed=[file_to_remove])
                 
                 # Clear the preview
                 self.preview_canvas.delete("all")
@@ -470,17 +845,19 @@ class WhatsAppStoryPosterUI:
         
         try:
             deleted_count = 0
+            deleted_paths = []
             for file_path in self.image_files:
                 try:
                     os.remove(file_path)
                     deleted_count += 1
+                    deleted_paths.append(file_path)
                 except:
                     pass
             
             self.selected_image = None
             
-            # Reload the images
-            self.load_images_from_folder()
+            # Drop the deleted photos from the grid
+            self.apply_folder_changes(removed=deleted_paths)
             
             # Clear the preview
             self.preview_canvas.delete("all")
@@ -510,6 +887,7 @@ class WhatsAppStoryPosterUI:
                 return
             
             os.makedirs(new_folder_path)
+            self.photo_index.rescan([new_folder_path])
             
             # Update folders list
             self.folders = self.get_subfolders()
@@ -543,7 +921,7 @@ class WhatsAppStoryPosterUI:
         # Clear the preview
         self.preview_canvas.delete("all")
         
-        self.status_var.set(f"'{selected}' klasörüne geçildi")
+        self.status_var.set(f"'{selected}' klasörüne geçildi ({self.thumbnail_cache.stats_text()})")
     
     def start_posting(self):
         """Start the WhatsApp story posting process."""
@@ -551,6 +929,10 @@ class WhatsAppStoryPosterUI:
             messagebox.showinfo("Zaten Çalışıyor", "İşlem zaten çalışıyor.")
             return
         
+        if not self.library_ready:
+            messagebox.showinfo("Yükleniyor", "Fotoğraflar hâlâ yükleniyor. Lütfen biraz bekleyin.")
+            return
+        
         # Check if there are images in the current folder
         if not self.image_files:
             messagebox.showerror("Fotoğraf Yok", "Mevcut klasörde gönderilebilecek fotoğraf yok.")
@@ -558,8 +940,25 @@ class WhatsAppStoryPosterUI:
         
         num_photos = self.num_photos_var.get()
         
+        # Offer to finish a run that was stopped or interrupted in this folder
+        journal = JobJournal.find_resumable(self.current_folder)
+        if journal is not None:
+            resume = messagebox.askyesnocancel(
+                "Yarım Kalan Gönderim",
+                f"Bu klasörde yarım kalmış bir gönderim var "
+                f"({len(journal.posted)}/{len(journal.photos)} fotoğraf gönderildi).\n\n"
+                f"Kaldığı yerden devam edilsin mi?\n"
+                f"(Hayır derseniz yeni rastgele fotoğraflar seçilir.)"
+            )
+            if resume is None:
+                return
+            if resume:
+                num_photos = len(journal.remaining())
+            else:
+                journal = None
+        
         # Check if enough photos
-        if len(self.image_files) < num_photos:
+        if journal is None and len(self.image_files) < num_photos:
             response = messagebox.askyesno(
                 "Yeterli Fotoğraf Yok",
                 f"{num_photos} fotoğraf göndermek istiyorsunuz ancak klasörde sadece {len(self.image_files)} fotoğraf var.\n\n"
@@ -586,30 +985,98 @@ class WhatsAppStoryPosterUI:
         self.running = True
         self.start_button.config(state=tk.DISABLED)
         self.top_start_btn.config(state=tk.DISABLED)
-        self.bottom_start_btn.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
         self.status_var.set("WhatsApp Hikaye Gönderici başlatılıyor...")
         
+        # One browser session is kept open and reused by every run
+        headless = self.headless_var.get()
+        if self.browser_session is not None and self.browser_session.headless != headless:
+            self.browser_session.close()
+            self.browser_session = None
+        
         # Start the process in a separate thread
+        self.cancel_token = CancelToken()
+        self.progress_channel = ProgressChannel()
+        self.progress_tracker = ProgressTracker()
+        self.progress_bar.config(value=0, maximum=max(1, num_photos))
+        self.progress_text_var.set("")
+        self.root.after(self.PROGRESS_INTERVAL_MS, self.poll_progress)
         self.running_thread = threading.Thread(
             target=self.run_posting_process,
-            args=(self.current_folder, num_photos, False)  # Always run with headless=False
+            args=(self.current_folder, num_photos, headless, journal,
+                  ON_FINISH_CLOSE if self.close_browser_var.get() else ON_FINISH_RELEASE,
+                  self.selected_policy(), self.no_repeat_days_var.get() or None)
         )
         self.running_thread.daemon = True
         self.running_thread.start()
     
-    def run_posting_process(self, folder, num_photos, headless):
+    def selected_policy(self):
+        """Return the selection policy name chosen in the settings."""
+        label = self.policy_var.get()
+        for policy, policy_label in self.POLICY_LABELS.items():
+            if policy_label == label:
+                return policy
+        return DEFAULT_POLICY
+    
+    def run_posting_process(self, folder, num_photos, headless, journal=None, on_finish=ON_FINISH_RELEASE,
+                            selection_policy=DEFAULT_POLICY, no_repeat_days=None):
         """Run the WhatsApp story posting process in a separate thread."""
+        cancel_token = self.cancel_token
         try:
+            # Importing selenium takes a moment, so it happens here rather than on the Tk thread
+            load_poster()
+            if BrowserSession is not None and self.browser_session is None:
+                self.browser_session = BrowserSession(headless=headless)
+            
             self.update_status(f"{os.path.basename(folder)} klasöründen {num_photos} fotoğraf gönderiliyor...")
-            post_whatsapp_stories(folder, num_photos, headless)
-            self.update_status("Gönderme işlemi tamamlandı!")
+            posted = post_whatsapp_stories(
+                folder, num_photos, headless,
+                photo_index=self.photo_index, catalog=self.catalog, session=self.browser_session,
+                cancel_token=cancel_token, journal=journal, on_finish=on_finish,
+                progress_channel=self.progress_channel,
+                selection_policy=selection_policy, no_repeat_days=no_repeat_days
+            )
+            if cancel_token.cancelled:
+                self.update_status(
+                    f"İşlem durduruldu ({posted or 0} fotoğraf gönderildi). "
+                    f"Bir sonraki başlatmada kaldığı yerden devam edebilirsiniz."
+                )
+            else:
+                self.update_status("Gönderme işlemi tamamlandı!")
         except Exception as e:
             self.update_status(f"Hata: {str(e)}")
         finally:
             # Reset UI state
             self.root.after(0, self.reset_ui_state)
     
+    def poll_progress(self):
+        """Apply all progress events that arrived since the last tick with one UI update."""
+        tracker = self.progress_tracker
+        events = self.progress_channel.drain()
+        for event in events:
+            tracker.apply(event)
+        
+        if events:
+            self.progress_bar.config(maximum=max(1, tracker.total), value=tracker.done)
+            parts = [f"{tracker.sent}/{tracker.total} gönderildi"]
+            if tracker.failed:
+                parts.append(f"{tracker.failed} başarısız")
+            rate = tracker.photos_per_minute()
+            if rate is not None:
+                parts.append(f"{rate:.1f} foto/dk")
+            eta = tracker.eta_seconds()
+            if eta is not None and not tracker.finished:
+                parts.append(f"kalan ~{int(eta) // 60:02d}:{int(eta) % 60:02d}")
+            self.progress_text_var.set(" • ".join(parts))
+            if tracker.current and self.running and not self.cancel_token.cancelled:
+                names = ", ".join(os.path.basename(p) for p in tracker.current[:3])
+                more = f" +{len(tracker.current) - 3}" if len(tracker.current) > 3 else ""
+                self.status_var.set(f"Gönderiliyor: {names}{more}")
+        
+        # Keep ticking until the job has finished and its last events are shown
+        if self.running or events:
+            self.root.after(self.PROGRESS_INTERVAL_MS, self.poll_progress)
+    
     def update_status(self, message):
         """Update the status message from a thread."""
         self.root.after(0, lambda: self.status_var.set(message))
@@ -619,7 +1086,6 @@ class WhatsAppStoryPosterUI:
         self.running = False
         self.start_button.config(state=tk.NORMAL)
         self.top_start_btn.config(state=tk.NORMAL)
-        self.bottom_start_btn.config(state=tk.NORMAL)
         self.stop_button.config(state=tk.DISABLED)
     
     def stop_posting(self):
@@ -630,21 +1096,29 @@ class WhatsAppStoryPosterUI:
         response = messagebox.askyesno(
             "Durdurmayı Onayla",
             "Gönderme işlemini durdurmak istediğinizden emin misiniz?\n\n"
-            "Bu, tarayıcının açık kalmasına neden olabilir."
+            "Gönderilmeyen fotoğraflar daha sonra kaldığı yerden gönderilebilir."
         )
         
-        if not response:
+        if not response or not self.running:
             return
         
-        self.status_var.set("İşlem durduruluyor... Lütfen bekleyin.")
-        
-        # There's no clean way to stop the Selenium process
-        # We can only terminate the thread, which isn't recommended
-        # Instead, we'll just update the UI to reflect the stopped state
-        # and the user will need to manually close the browser
-        
-        self.reset_ui_state()
-        self.status_var.set("İşlem durduruldu. Tarayıcıyı manuel olarak kapatmanız gerekebilir.")
+        # The job stops at its next step boundary; run_posting_process resets
+        # the UI once it has returned
+        self.cancel_token.cancel()
+        self.stop_button.config(state=tk.DISABLED)
+        self.status_var.set("İşlem durduruluyor... Mevcut adım bitince duracak.")
+    
+    def on_close(self):
+        """Stop the background workers, close the browser session and the catalog, and quit."""
+        if self.importer is not None:
+            self.importer.cancel()
+        self.photo_index.stop()
+        self.thumbnail_loader.shutdown()
+        if self.browser_session is not None:
+            self.browser_session.close()
+        if self.catalog is not None:
+            self.catalog.close()
+        self.root.quit()
     
     def show_about(self):
         """Show about dialog."""
@@ -669,7 +1143,42 @@ class WhatsAppStoryPosterUI:
         messagebox.showinfo("Yardım", help_text)
 
 
+def install_startup_probe(root, app, probe_path):
+    """
+    Record start-up timings for startupbench.py and quit once the library is shown.
+
+    first_paint is taken on the first idle pass after the window was exposed,
+    i.e. once Tk has drawn it; ready once the grid shows the scanned library.
+    Times are UNIX timestamps, so the benchmark can subtract its launch time.
+    """
+    timings = {"modules_at_paint": []}
+    
+    def on_expose(event):
+        if not timings.get("exposed"):
+            timings["exposed"] = True
+            root.after_idle(record_paint)
+    
+    def record_paint():
+        timings["first_paint"] = time.time()
+        timings["modules_at_paint"] = sorted(m for m in ("selenium", "webauto", "numpy") if m in sys.modules)
+        wait_ready()
+    
+    def wait_ready():
+        if not app.library_ready:
+            root.after(10, wait_ready)
+            return
+        root.update_idletasks()
+        timings["ready"] = time.time()
+        with open(probe_path, "w", encoding="utf-8") as f:
+            json.dump(timings, f)
+        app.on_close()
+    
+    root.bind("<Expose>", on_expose, add="+")
+
 if __name__ == "__main__":
+    # Required for the story media process pool in the frozen build
+    multiprocessing.freeze_support()
+    
     # Ensure that PIL is installed
     try:
         import PIL
@@ -681,4 +1190,6 @@ if __name__ == "__main__":
     # Create the Tkinter application
     root = tk.Tk()
     app = WhatsAppStoryPosterUI(root)
+    if os.environ.get(STARTUP_PROBE_ENV):
+        install_startup_probe(root, app, os.environ[STARTUP_PROBE_ENV])
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,224 @@
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Stand-in for the parts of WhatsApp Web that webauto drives: a logged-in
+# side panel with the Status tab, the Add Status button, the attach menu with
+# "Photos & videos", a file input and the upload preview with Send. Settings
+# arrive as JSON in window.MOCK_CONFIG (see MockWhatsAppServer).
+MOCK_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>WhatsApp (mock)</title>
+<style>
+body { font-family: sans-serif; margin: 0; display: flex; height: 100vh; }
+#side { width: 320px; border-right: 1px solid #ccc; padding: 8px; }
+#main { flex: 1; padding: 16px; }
+button, div[role='button'], .menu-item { cursor: pointer; padding: 8px 12px; margin: 4px; display: inline-block; border: 1px solid #999; }
+#composer { position: fixed; inset: 40px; background: #fff; border: 2px solid #0a0; padding: 16px; }
+</style>
+<script>window.MOCK_CONFIG = __CONFIG__;</script>
+</head>
+<body>
+<div id="app"></div>
+<script>
+(function () {
+    const cfg = window.MOCK_CONFIG;
+    let seed = cfg.seed;
+    function rand() {
+        // Deterministic per page load so a benchmark run is reproducible
+        seed = (seed * 1103515245 + 12345) % 2147483648;
+        return seed / 2147483648;
+    }
+    function later(ms, fn) { setTimeout(fn, ms * (1 + cfg.jitter * (rand() * 2 - 1))); }
+    function drifted() { return rand() < cfg.drift; }
+    function el(html) {
+        const t = document.createElement('template');
+        t.innerHTML = html.trim();
+        return t.content.firstChild;
+    }
+
+    const stats = window.__mockStats = { posted: 0, sends: 0, files: [] };
+    const app = document.getElementById('app');
+    let main = null;
+
+    function closeOverlays() {
+        document.querySelectorAll('#attach-menu, #composer').forEach(n => n.remove());
+    }
+
+    function renderSide() {
+        const side = el('<div id="side"><div data-testid="chat-list">Chats</div></div>');
+        // Drift swaps the labelled Status button for an icon-only one
+        const status = drifted()
+            ? el('<button data-tab="2"><span data-icon="status"></span></button>')
+            : el('<button role="button" data-tab="2" aria-label="Status"><span data-icon="status"></span></button>');
+        status.addEventListener('click', () => later(cfg.render_ms, renderStatusPage));
+        side.appendChild(status);
+        app.appendChild(side);
+        main = el('<div id="main"></div>');
+        app.appendChild(main);
+    }
+
+    function renderStatusPage() {
+        main.innerHTML = '';
+        const add = drifted()
+            ? el('<button title="Add Status" data-tab="2"><span data-icon="plus"></span></button>')
+            : el('<button aria-label="Add Status" data-tab="2"><span data-icon="plus"></span></button>');
+        add.addEventListener('click', () => later(cfg.render_ms, renderAttachMenu));
+        main.appendChild(add);
+        for (let i = 0; i < cfg.status_items; i++) {
+            main.appendChild(el('<div class="status-item">Status ' + i + '</div>'));
+        }
+    }
+
+    function renderAttachMenu() {
+        closeOverlays();
+        const menu = el('<div id="attach-menu"></div>');
+        const item = drifted()
+            ? el('<div class="menu-item"><span>Photos &amp; videos</span></div>')
+            : el('<div class="menu-item"><span data-icon="media-multiple"></span><span>Photos &amp; videos</span></div>');
+        const input = el('<input type="file" accept="image/*,video/*" style="display:none">');
+        if (cfg.multiple) { input.multiple = true; }
+        input.addEventListener('change', () => {
+            const names = Array.from(input.files).map(f => f.name);
+            later(cfg.render_ms + cfg.upload_ms * names.length, () => renderComposer(names));
+        });
+        menu.appendChild(item);
+        menu.appendChild(input);
+        main.appendChild(menu);
+    }
+
+    function renderComposer(names) {
+        closeOverlays();
+        const composer = el('<div id="composer"><div>' + names.length + ' file(s)</div></div>');
+        const send = drifted()
+            ? el('<div role="button" class="send"><span data-icon="send"></span></div>')
+            : el('<div role="button" aria-label="Send" data-testid="send"><span data-icon="send"></span></div>');
+        send.addEventListener('click', () => {
+            stats.sends += 1;
+            later(cfg.send_ms, () => {
+                stats.posted += names.length;
+                stats.files.push(...names);
+                composer.remove();
+            });
+        });
+        composer.appendChild(send);
+        document.body.appendChild(composer);
+    }
+
+    document.addEventListener('keydown', e => { if (e.key === 'Escape') { closeOverlays(); } });
+    later(cfg.login_ms, renderSide);
+})();
+</script>
+</body>
+</html>
+"""
+
+# Default timings in milliseconds
+DEFAULT_CONFIG = {
+    "login_ms": 300,      # Until the side panel (the logged-in marker) appears
+    "render_ms": 150,     # Between a click and the next panel
+    "upload_ms": 80,      # Per attached file before the preview shows Send
+    "send_ms": 200,       # Between clicking Send and the composer closing
+    "jitter": 0.2,        # +/- fraction applied to every delay
+    "drift": 0.0,         # Chance that an element renders with fallback-only markup
+    "multiple": True,     # Whether the file input accepts several files
+    "status_items": 30,   # Filler rows on the status page
+    "seed": 1,
+}
+
+class MockWhatsAppServer:
+    """
+    Serves the mock WhatsApp Web page from localhost.
+
+    Every setting in DEFAULT_CONFIG can be given to the constructor and
+    overridden per page load with query parameters, e.g.
+    server.url_for(drift=0.5, multiple=False).
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, **config):
+        unknown = set(config) - set(DEFAULT_CONFIG)
+        if unknown:
+            raise ValueError(f"Unknown mock settings: {', '.join(sorted(unknown))}")
+        self.config = dict(DEFAULT_CONFIG, **config)
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urllib.parse.urlparse(self.path)
+                if parsed.path != "/":
+                    self.send_error(404)
+                    return
+                body = MOCK_PAGE.replace("__CONFIG__", json.dumps(server.page_config(parsed.query)))
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def page_config(self, query=""):
+        """Return the page settings: the server's config overridden by query parameters."""
+        config = dict(self.config)
+        for key, values in urllib.parse.parse_qs(query).items():
+            if key not in DEFAULT_CONFIG:
+                continue
+            default = DEFAULT_CONFIG[key]
+            value = values[-1]
+            if isinstance(default, bool):
+                config[key] = value.lower() in ("1", "true", "yes")
+            else:
+                config[key] = type(default)(value)
+        return config
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def url_for(self, **overrides):
+        """Return the page URL with per-load setting overrides as query parameters."""
+        if not overrides:
+            return self.url
+        query = {key: int(value) if isinstance(value, bool) else value for key, value in overrides.items()}
+        return self.url + "?" + urllib.parse.urlencode(query)
+
+    def start(self):
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-whatsapp", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == "__main__":
+    import sys
+    import time
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    server = MockWhatsAppServer(port=port).start()
+    print(f"Mock WhatsApp Web at {server.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
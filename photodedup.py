@@ -0,0 +1,271 @@
+import math
+
+
+# Photos whose dHash and pHash both differ in at most this many of 64 bits are near-duplicates
+NEAR_DUPLICATE_DISTANCE = 8
+
+HASH_SIZE = 8
+PHASH_SIZE = 32  # pHash takes the DCT of a PHASH_SIZE x PHASH_SIZE thumbnail
+
+def hamming(a, b):
+    """Number of differing bits between two hashes."""
+    return (a ^ b).bit_count()
+
+def _bits_to_int(bits):
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bool(bit))
+    return value
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II basis as a list of rows."""
+    rows = []
+    for k in range(n):
+        scale = math.sqrt((1 if k == 0 else 2) / n)
+        rows.append([scale * math.cos(math.pi * (2 * i + 1) * k / (2 * n)) for i in range(n)])
+    return rows
+
+_DCT = _dct_matrix(PHASH_SIZE)
+_numpy_state = None  # (numpy module or None, DCT matrix as an array), set by _numpy()
+
+def _numpy():
+    """
+    Return (numpy, DCT array), or (None, None) without numpy.
+
+    numpy is imported on the first hash rather than with the module, so the
+    app does not pay for it at start-up. Without it hashing falls back to
+    pure Python, which is slower but gives the same bits.
+    """
+    global _numpy_state
+    if _numpy_state is None:
+        try:
+            import numpy
+            _numpy_state = (numpy, numpy.array(_DCT))
+        except ImportError:
+            _numpy_state = (None, None)
+    return _numpy_state
+
+def _dhash_pixels(pixels, width):
+    """dHash of a row-major grayscale (HASH_SIZE + 1) x HASH_SIZE pixel list."""
+    bits = []
+    for y in range(HASH_SIZE):
+        row = pixels[y * width:(y + 1) * width]
+        bits.extend(row[x] > row[x + 1] for x in range(HASH_SIZE))
+    return _bits_to_int(bits)
+
+def _phash_pixels(pixels):
+    """pHash of a row-major grayscale PHASH_SIZE x PHASH_SIZE pixel list."""
+    n = PHASH_SIZE
+    rows = [pixels[y * n:(y + 1) * n] for y in range(n)]
+    # Only the low-frequency HASH_SIZE x HASH_SIZE corner of D * M * D^T is needed
+    partial = [[sum(d[i] * row[i] for i in range(n)) for d in _DCT[:HASH_SIZE]] for row in rows]
+    low = [
+        sum(_DCT[k][y] * partial[y][j] for y in range(n))
+        for k in range(HASH_SIZE) for j in range(HASH_SIZE)
+    ]
+    median = sorted(low[1:])[(len(low) - 1) // 2]  # The DC term would dominate the median
+    return _bits_to_int(value > median for value in low)
+
+def image_hashes(file_path):
+    """
+    Return (dhash, phash) of an image as 64-bit integers.
+
+    Both come from one decode; JPEGs are decoded at a reduced size with
+    draft(), which is all a 32x32 thumbnail needs.
+    """
+    from PIL import Image
+    with Image.open(file_path) as img:
+        img.draft("L", (PHASH_SIZE * 4, PHASH_SIZE * 4))
+        gray = img.convert("L")
+        small = gray.resize((PHASH_SIZE, PHASH_SIZE), Image.LANCZOS)
+        tiny = gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+
+    np, dct = _numpy()
+    if np is not None:
+        t = np.asarray(tiny, dtype=np.int16)
+        dhash = _bits_to_int((t[:, :-1] > t[:, 1:]).ravel())
+        coefficients = (dct @ np.asarray(small, dtype=np.float64) @ dct.T)[:HASH_SIZE, :HASH_SIZE].ravel()
+        phash = _bits_to_int(coefficients > np.median(coefficients[1:]))
+        return dhash, phash
+    return _dhash_pixels(list(tiny.getdata()), HASH_SIZE + 1), _phash_pixels(list(small.getdata()))
+
+def format_hash(value):
+    """Hash as the 16-digit hex string stored in the catalog."""
+    return f"{value:016x}"
+
+def parse_hash(text):
+    return int(text, 16) if text else None
+
+class MultiIndexHash:
+    """
+    Index of 64-bit hashes for Hamming-radius queries (multi-index hashing).
+
+    Hashes are split into chunks; if two hashes are within max_distance, by
+    the pigeonhole principle at least one chunk differs in at most
+    max_distance // chunks bits. A query therefore only looks up, per chunk,
+    the buckets within that small radius and checks the few hashes found
+    there, instead of comparing against every hash.
+    """
+
+    def __init__(self, max_distance, bits=64):
+        self.max_distance = max_distance
+        # Enough chunks that each query only needs chunk radius 0 or 1
+        count = min(bits, max_distance // 2 + 1)
+        widths = [bits // count + (1 if i < bits % count else 0) for i in range(count)]
+        self._chunks = []  # (shift, mask, width)
+        shift = bits
+        for width in widths:
+            shift -= width
+            self._chunks.append((shift, (1 << width) - 1, width))
+        self._radius = max_distance // count
+        # XOR masks reaching every key within the chunk radius, per chunk width
+        self._flips = {width: self._flip_masks(width) for width in set(widths)}
+        self._tables = [{} for _ in self._chunks]
+        self._items = {}  # hash -> items
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, value, item):
+        """Insert item under hash value."""
+        self._size += 1
+        items = self._items.get(value)
+        if items is not None:
+            items.append(item)
+            return
+        self._items[value] = [item]
+        for (shift, mask, _), table in zip(self._chunks, self._tables):
+            table.setdefault((value >> shift) & mask, []).append(value)
+
+    def _flip_masks(self, width):
+        masks = [0]
+        if self._radius >= 1:
+            masks.extend(1 << bit for bit in range(width))
+        if self._radius >= 2:
+            masks.extend((1 << a) | (1 << b) for a in range(width) for b in range(a + 1, width))
+        return masks
+
+    def search(self, value, max_distance=None):
+        """Return (distance, hash, item) for every item within max_distance of value."""
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        seen = set()
+        results = []
+        for (shift, mask, width), table in zip(self._chunks, self._tables):
+            key = (value >> shift) & mask
+            for flip in self._flips[width]:
+                for candidate in table.get(key ^ flip, ()):
+                    if candidate in seen:
+                        continue
+                    seen.add(candidate)
+                    distance = hamming(value, candidate)
+                    if distance <= max_distance:
+                        results.extend((distance, candidate, item) for item in self._items[candidate])
+        return results
+
+    def hashes(self):
+        """Yield (hash, items) for every distinct hash."""
+        return self._items.items()
+
+class DuplicateIndex:
+    """
+    Finds exact and near duplicates among photos.
+
+    Exact duplicates share a SHA-256. Near duplicates are found through a
+    multi-index on the dHash and confirmed with the pHash, so both hashes
+    have to be within the distance threshold.
+    """
+
+    def __init__(self, max_distance=NEAR_DUPLICATE_DISTANCE):
+        self.max_distance = max_distance
+        self._by_sha = {}
+        self._hashes = {}
+        self._dhash_index = MultiIndexHash(max_distance)
+
+    def __len__(self):
+        return len(self._hashes)
+
+    @classmethod
+    def from_catalog(cls, catalog, folder=None, max_distance=NEAR_DUPLICATE_DISTANCE):
+        """Build an index from the cached hashes in a PhotoCatalog (one folder or the whole library)."""
+        index = cls(max_distance)
+        for path, sha256, dhash, phash in catalog.photo_hashes(folder):
+            index.add(path, sha256, parse_hash(dhash), parse_hash(phash))
+        return index
+
+    def add(self, path, sha256, dhash, phash):
+        """Add a photo; dhash/phash may be None if it could not be decoded."""
+        self._hashes[path] = (sha256, dhash, phash)
+        if sha256:
+            self._by_sha.setdefault(sha256, []).append(path)
+        if dhash is not None and phash is not None:
+            self._dhash_index.add(dhash, path)
+
+    def hashes_of(self, path):
+        """Return (sha256, dhash, phash) of an indexed path; all None if unknown."""
+        return self._hashes.get(path, (None, None, None))
+
+    def exact(self, sha256):
+        """Paths with this content hash."""
+        return list(self._by_sha.get(sha256, ()))
+
+    def near(self, dhash, phash, exclude=None):
+        """Return (distance, path) of indexed photos that look like the given hashes, closest first."""
+        if dhash is None or phash is None:
+            return []
+        matches = []
+        for distance, _, path in self._dhash_index.search(dhash, self.max_distance):
+            if path == exclude:
+                continue
+            if hamming(phash, self._hashes[path][2]) <= self.max_distance:
+                matches.append((distance, path))
+        matches.sort()
+        return matches
+
+    def groups(self):
+        """
+        Group every indexed photo with its duplicates.
+
+        Returns:
+            list: Lists of two or more paths; each list is one set of duplicates
+        """
+        parent = {}
+
+        def find(path):
+            parent.setdefault(path, path)
+            while parent[path] != path:
+                parent[path] = parent[parent[path]]
+                path = parent[path]
+            return path
+
+        def union(a, b):
+            parent[find(a)] = find(b)
+
+        for paths in self._by_sha.values():
+            for other in paths[1:]:
+                union(paths[0], other)
+        for dhash, paths in self._dhash_index.hashes():
+            for path in paths:
+                for _, other in self.near(dhash, self._hashes[path][2], exclude=path):
+                    union(path, other)
+
+        members = {}
+        for path in parent:
+            members.setdefault(find(path), []).append(path)
+        return [sorted(group) for group in members.values() if len(group) > 1]
+
+def take_distinct(ordered, count, index):
+    """Take up to count paths from ordered, in order, skipping duplicates of earlier picks."""
+    picked = []
+    picked_index = DuplicateIndex(index.max_distance)
+    for path in ordered:
+        if len(picked) >= count:
+            break
+        sha256, dhash, phash = index.hashes_of(path)
+        if sha256 and picked_index.exact(sha256):
+            continue
+        if picked_index.near(dhash, phash):
+            continue
+        picked.append(path)
+        picked_index.add(path, sha256, dhash, phash)
+    return picked
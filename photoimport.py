@@ -0,0 +1,258 @@
+import os
+import sys
+import queue
+import random
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from photolibrary import file_sha256
+from photodedup import DuplicateIndex, image_hashes
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has no fcntl; imports there use hardlinks or copies
+    fcntl = None
+
+# Linux ioctl that makes dest share src's blocks (btrfs, XFS, ...) until either is written
+FICLONE = 0x40049409
+
+# Outcomes of importing one file
+IMPORTED = "imported"     # dest, method
+DUPLICATE = "duplicate"   # match: a byte-identical photo already in the library or the import
+SIMILAR = "similar"       # match: a look-alike; held back until import_similar() is called
+FAILED = "failed"         # error
+
+# How an imported file was written
+METHOD_REFLINK = "reflink"
+METHOD_HARDLINK = "hardlink"
+METHOD_COPY = "copy"
+
+class ImportResult:
+    """What happened to one source file."""
+
+    __slots__ = ("source", "outcome", "dest", "method", "match", "error")
+
+    def __init__(self, source, outcome, dest=None, method=None, match=None, error=None):
+        self.source = source
+        self.outcome = outcome
+        self.dest = dest
+        self.method = method
+        self.match = match
+        self.error = error
+
+    def __repr__(self):
+        return f"ImportResult({os.path.basename(self.source)!r}, {self.outcome!r})"
+
+def reflink(src, dest):
+    """Clone src to the new file dest without copying data; return False where unsupported."""
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+    with open(src, "rb") as source, open(dest, "xb") as target:
+        try:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+            cloned = True
+        except OSError:
+            cloned = False
+    if not cloned:
+        os.remove(dest)
+        return False
+    shutil.copystat(src, dest)
+    return True
+
+def place_file(src, dest, allow_hardlink=True):
+    """
+    Put a copy of src at dest as cheaply as the file systems allow.
+
+    On the same file system a reflink is tried first, then a hardlink;
+    otherwise, or if both fail, the data is copied.
+
+    Returns:
+        str: METHOD_REFLINK, METHOD_HARDLINK or METHOD_COPY
+    """
+    try:
+        same_device = os.stat(src).st_dev == os.stat(os.path.dirname(dest)).st_dev
+    except OSError:
+        same_device = False
+    if same_device:
+        try:
+            if reflink(src, dest):
+                return METHOD_REFLINK
+        except OSError:
+            pass
+        if allow_hardlink:
+            try:
+                os.link(src, dest)
+                return METHOD_HARDLINK
+            except OSError:
+                pass
+    shutil.copy2(src, dest)
+    return METHOD_COPY
+
+class BulkImporter:
+    """
+    Imports many photos into one folder on a bounded thread pool.
+
+    Each worker hashes a file, checks it against the library and the files
+    imported so far, and places it in the folder. Exact duplicates are
+    skipped, look-alikes are held back for the caller to confirm, and every
+    outcome is queued as an ImportResult for drain(), so a UI timer can show
+    progress and add files to the grid as they land.
+    """
+
+    def __init__(self, dest_folder, catalog=None, max_workers=None, allow_hardlink=True):
+        """
+        Args:
+            dest_folder (str): Folder the photos are imported into
+            catalog (PhotoCatalog): Library checked for duplicates, or None to only compare the imported files
+            max_workers (int): Worker threads (default: up to 4)
+            allow_hardlink (bool): Hardlink files on the same file system when reflinks are not supported
+        """
+        self.dest_folder = dest_folder
+        self.catalog = catalog
+        self.allow_hardlink = allow_hardlink
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or min(4, os.cpu_count() or 2),
+            thread_name_prefix="import"
+        )
+        self.total = 0
+        self.processed = 0
+        self.results = []  # Every result drained so far
+        self._results = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._reserved = set()
+        self._index = None
+        self._cancelled = threading.Event()
+        self._running = 0
+
+    @property
+    def finished(self):
+        """True once every submitted file has been handled and drained."""
+        return self._running == 0 and self.processed == self.total
+
+    def start(self, sources):
+        """Import sources in the background, checking each for duplicates first."""
+        self._launch(sources, check=True)
+
+    def import_similar(self):
+        """Import the look-alikes that were held back."""
+        similar = [result.source for result in self.results if result.outcome == SIMILAR]
+        self._launch(similar, check=False)
+
+    def cancel(self):
+        """Skip the files that have not been started; files being written are finished."""
+        self._cancelled.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def drain(self):
+        """Return the results that arrived since the last call (call from one thread only)."""
+        results = []
+        while True:
+            try:
+                results.append(self._results.get_nowait())
+            except queue.Empty:
+                break
+        self.processed += len(results)
+        self.results.extend(results)
+        return results
+
+    def summary(self):
+        """Return counts per outcome and per placement method, plus the failures."""
+        counts = {IMPORTED: 0, DUPLICATE: 0, SIMILAR: 0, FAILED: 0}
+        methods = {}
+        failures = []
+        # A look-alike that was imported later shows up twice; its last result counts
+        final = {result.source: result for result in self.results}
+        for result in final.values():
+            counts[result.outcome] += 1
+            if result.method:
+                methods[result.method] = methods.get(result.method, 0) + 1
+            if result.outcome == FAILED:
+                failures.append((result.source, result.error))
+        return counts, methods, failures
+
+    def _launch(self, sources, check):
+        sources = list(dict.fromkeys(sources))
+        if not sources:
+            return
+        with self._lock:
+            self.total += len(sources)
+            self._running += 1
+        threading.Thread(target=self._run, args=(sources, check), name="import", daemon=True).start()
+
+    def _run(self, sources, check):
+        """Coordinator thread: load the duplicate index once, then fan the files out to the pool."""
+        try:
+            if check and self._index is None:
+                self._index = DuplicateIndex()
+                if self.catalog is not None:
+                    try:
+                        self._index = DuplicateIndex.from_catalog(self.catalog)
+                    except Exception as e:
+                        print(f"Could not load the library for duplicate checks: {e}")
+            futures = {}
+            for source in sources:
+                try:
+                    futures[source] = self.executor.submit(self._import_one, source, check)
+                except RuntimeError:
+                    # Cancelled; the pool no longer takes work
+                    self._results.put(ImportResult(source, FAILED, error="cancelled"))
+            wait(futures.values())
+            # Files whose tasks were cancelled before they started still need a result
+            for source, future in futures.items():
+                if future.cancelled():
+                    self._results.put(ImportResult(source, FAILED, error="cancelled"))
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _import_one(self, source, check):
+        """Worker-thread side: hash, check and place one file."""
+        if self._cancelled.is_set():
+            self._results.put(ImportResult(source, FAILED, error="cancelled"))
+            return
+        try:
+            if check:
+                result = self._check(source)
+                if result is not None:
+                    self._results.put(result)
+                    return
+            dest = self._destination(source)
+            try:
+                method = place_file(source, dest, self.allow_hardlink)
+            finally:
+                with self._lock:
+                    self._reserved.discard(dest)
+            self._results.put(ImportResult(source, IMPORTED, dest=dest, method=method))
+        except Exception as e:
+            self._results.put(ImportResult(source, FAILED, error=str(e)))
+
+    def _check(self, source):
+        """Return a DUPLICATE or SIMILAR result for source, or None if it is new."""
+        sha256 = file_sha256(source)
+        try:
+            dhash, phash = image_hashes(source)
+        except Exception:
+            # Not decodable here; only the exact check applies
+            dhash = phash = None
+        with self._lock:
+            exact = self._index.exact(sha256)
+            if exact:
+                return ImportResult(source, DUPLICATE, match=exact[0])
+            near = self._index.near(dhash, phash)
+            # Later files are also compared with this one, imported or not
+            self._index.add(source, sha256, dhash, phash)
+        if near:
+            return ImportResult(source, SIMILAR, match=near[0][1])
+        return None
+
+    def _destination(self, source):
+        """Pick a free path in dest_folder, adding a random suffix if the name is taken."""
+        filename = os.path.basename(source)
+        base, ext = os.path.splitext(filename)
+        with self._lock:
+            dest = os.path.join(self.dest_folder, filename)
+            while os.path.exists(dest) or dest in self._reserved:
+                dest = os.path.join(self.dest_folder, f"{base}_{random.randint(1000, 9999)}{ext}")
+            self._reserved.add(dest)
+        return dest
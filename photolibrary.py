@@ -0,0 +1,343 @@
+import os
+import time
+import queue
+import sqlite3
+import hashlib
+import threading
+from appdata import data_path
+from photodedup import image_hashes, format_hash
+
+# Rows written per transaction while syncing
+BATCH_SIZE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS photos (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    sha256 TEXT,
+    dhash TEXT,
+    phash TEXT,
+    added_at REAL NOT NULL,
+    last_posted_at REAL,
+    post_count INTEGER NOT NULL DEFAULT 0,
+    weight REAL NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_photos_folder ON photos(folder);
+CREATE INDEX IF NOT EXISTS idx_photos_last_posted ON photos(folder, last_posted_at);
+CREATE INDEX IF NOT EXISTS idx_photos_sha256 ON photos(sha256);
+
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    sha256 TEXT,
+    posted_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_posts_path ON posts(path);
+CREATE INDEX IF NOT EXISTS idx_posts_sha256 ON posts(sha256);
+CREATE INDEX IF NOT EXISTS idx_posts_posted_at ON posts(posted_at);
+"""
+
+def default_catalog_path():
+    """Return the per-user location of the photo catalog database."""
+    return data_path("library.db")
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """Return the hex SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def image_dimensions(file_path):
+    """Return (width, height) from the image header, or (None, None) if unreadable."""
+    try:
+        from PIL import Image
+        with Image.open(file_path) as img:
+            return img.size
+    except Exception:
+        return None, None
+
+def perceptual_hashes(file_path):
+    """Return (dhash, phash) as catalog hex strings; empty strings if the image cannot be decoded."""
+    try:
+        dhash, phash = image_hashes(file_path)
+        return format_hash(dhash), format_hash(phash)
+    except Exception:
+        return "", ""
+
+class PhotoCatalog:
+    """
+    SQLite catalog of the photo library and its posting history.
+
+    Every photo is stored with its folder, size, mtime, dimensions and content
+    hash, so listing, filtering and picking candidates are index lookups rather
+    than directory walks. The connection is shared between threads and guarded
+    by a lock; writes are batched into transactions.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or default_catalog_path()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._conn.commit()
+        # Index changes waiting to be cataloged by the worker apply_changes() starts
+        self._changes = queue.SimpleQueue()
+        self._changes_lock = threading.Lock()
+        self._changes_thread = None
+
+    def _migrate(self):
+        """Add columns introduced after a catalog was created."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(photos)")}
+        for column, definition in (("dhash", "TEXT"), ("phash", "TEXT"), ("weight", "REAL NOT NULL DEFAULT 1")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE photos ADD COLUMN {column} {definition}")
+
+    def close(self):
+        """Close the database connection."""
+        self._changes.put(None)
+        with self._lock:
+            self._conn.close()
+
+    # Syncing with the file system
+
+    def sync_folder(self, folder, paths):
+        """
+        Bring the catalog for folder in line with paths.
+
+        Files whose size and mtime are unchanged are skipped, so re-syncing a
+        known folder only stats its files. Rows for files that are gone are
+        deleted; their posting history is kept.
+
+        Args:
+            folder (str): Absolute folder path
+            paths (iterable): Photo paths currently in the folder
+        """
+        folder = os.path.abspath(folder)
+        with self._lock:
+            known = {
+                row[0]: (row[1], row[2])
+                for row in self._conn.execute(
+                    "SELECT path, size, mtime_ns FROM photos WHERE folder = ?", (folder,)
+                )
+            }
+
+        paths = set(os.path.abspath(p) for p in paths)
+        changed = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if known.get(path) != (stat.st_size, stat.st_mtime_ns):
+                changed.append((path, stat))
+
+        self.add_photos(changed, folder)
+        self.remove_photos([path for path in known if path not in paths])
+
+    def add_photos(self, photos, folder=None):
+        """
+        Insert or refresh photos, reading their dimensions and computing their
+        content (SHA-256) and perceptual (dHash/pHash) hashes.
+
+        Args:
+            photos (list): (path, os.stat_result or None) pairs
+            folder (str): Folder of all photos, or None to derive it from each path
+        """
+        rows = []
+        for path, stat in photos:
+            try:
+                stat = stat or os.stat(path)
+                sha256 = file_sha256(path)
+            except OSError as e:
+                print(f"Could not catalog {path}: {e}")
+                continue
+            width, height = image_dimensions(path)
+            dhash, phash = perceptual_hashes(path)
+            rows.append((
+                path, folder or os.path.dirname(path), stat.st_size, stat.st_mtime_ns,
+                width, height, sha256, dhash, phash, time.time()
+            ))
+            if len(rows) >= BATCH_SIZE:
+                self._write_photos(rows)
+                rows = []
+        if rows:
+            self._write_photos(rows)
+
+    def _write_photos(self, rows):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO photos (path, folder, size, mtime_ns, width, height, sha256, dhash, phash, added_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    folder = excluded.folder, size = excluded.size, mtime_ns = excluded.mtime_ns,
+                    width = excluded.width, height = excluded.height, sha256 = excluded.sha256,
+                    dhash = excluded.dhash, phash = excluded.phash
+                """,
+                rows
+            )
+            # A photo posted before it was cataloged, or moved/renamed since,
+            # picks up its history from the posts made under its path or content
+            self._conn.executemany(
+                """
+                UPDATE photos SET
+                    last_posted_at = (SELECT MAX(posted_at) FROM posts
+                                      WHERE posts.path = photos.path OR posts.sha256 = photos.sha256),
+                    post_count = (SELECT COUNT(*) FROM posts
+                                  WHERE posts.path = photos.path OR posts.sha256 = photos.sha256)
+                WHERE path = ? AND last_posted_at IS NULL
+                """,
+                [(row[0],) for row in rows]
+            )
+
+    def remove_photos(self, paths):
+        """Delete catalog rows for paths in one transaction."""
+        paths = [(os.path.abspath(p),) for p in paths]
+        if not paths:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM photos WHERE path = ?", paths)
+
+    def apply_changes(self, folder, added, removed):
+        """
+        Photo index listener: queue added files to be cataloged and removed ones to be dropped.
+
+        Hashing new files takes a while, so it happens on the catalog's own
+        worker thread instead of holding up the watcher thread and the
+        listeners called after this one.
+        """
+        self._changes.put((os.path.abspath(folder), list(added), list(removed)))
+        with self._changes_lock:
+            if self._changes_thread is None:
+                self._changes_thread = threading.Thread(
+                    target=self._apply_queued_changes, name="catalog-updates", daemon=True
+                )
+                self._changes_thread.start()
+
+    def _apply_queued_changes(self):
+        """Worker thread: apply queued index changes in the order they happened until close()."""
+        while True:
+            change = self._changes.get()
+            if change is None:
+                return
+            folder, added, removed = change
+            try:
+                # A file changed in place comes as removed and added; refresh its row instead of dropping it
+                self.remove_photos(set(removed) - set(added))
+                self.add_photos([(path, None) for path in added], folder)
+            except sqlite3.Error as e:
+                print(f"Could not update the catalog for {folder}: {e}")
+
+    def sync_library(self, photo_index):
+        """Sync every folder known to a PhotoLibraryIndex."""
+        folders = [photo_index.photos_dir] + [
+            os.path.join(photo_index.photos_dir, name) for name in photo_index.subfolders()
+        ]
+        for folder in folders:
+            self.sync_folder(folder, photo_index.photos(folder))
+        self.backfill_hashes()
+
+    def backfill_hashes(self):
+        """Compute perceptual hashes for rows cataloged before they were stored."""
+        with self._lock:
+            paths = [row[0] for row in self._conn.execute("SELECT path FROM photos WHERE dhash IS NULL")]
+        for start in range(0, len(paths), BATCH_SIZE):
+            rows = [perceptual_hashes(path) + (path,) for path in paths[start:start + BATCH_SIZE]]
+            with self._lock, self._conn:
+                self._conn.executemany("UPDATE photos SET dhash = ?, phash = ? WHERE path = ?", rows)
+
+    # Queries
+
+    def photos_in_folder(self, folder, extensions=None):
+        """
+        Return the sorted photo paths in folder.
+
+        Args:
+            folder (str): Absolute folder path
+            extensions (iterable): Optional lower-case extensions to keep, e.g. ('.jpg', '.png')
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM photos WHERE folder = ? ORDER BY path", (os.path.abspath(folder),)
+            ).fetchall()
+        paths = [row[0] for row in rows]
+        if extensions:
+            extensions = tuple(extensions)
+            paths = [p for p in paths if p.lower().endswith(extensions)]
+        return paths
+
+    def rotation_info(self, folder):
+        """Return (path, last_posted_at, post_count, weight) for every photo in folder."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT path, last_posted_at, post_count, weight FROM photos WHERE folder = ?",
+                (os.path.abspath(folder),)
+            ).fetchall()
+
+    def set_weight(self, paths, weight):
+        """
+        Set the manual selection weight of paths (1 is normal, 0 never picks them).
+
+        Returns:
+            int: Number of cataloged photos updated
+        """
+        rows = [(weight, os.path.abspath(p)) for p in paths]
+        with self._lock, self._conn:
+            return self._conn.executemany("UPDATE photos SET weight = ? WHERE path = ?", rows).rowcount
+
+    def get_weight(self, path):
+        """Return the manual selection weight of path, or None if it is not cataloged."""
+        with self._lock:
+            row = self._conn.execute("SELECT weight FROM photos WHERE path = ?", (os.path.abspath(path),)).fetchone()
+        return row[0] if row else None
+
+    def photo_hashes(self, folder=None):
+        """Return (path, sha256, dhash, phash) rows for folder, or for the whole library."""
+        query = "SELECT path, sha256, dhash, phash FROM photos"
+        params = ()
+        if folder is not None:
+            query += " WHERE folder = ?"
+            params = (os.path.abspath(folder),)
+        with self._lock:
+            return self._conn.execute(query, params).fetchall()
+
+    # Posting history
+
+    def record_posts(self, paths, posted_at=None):
+        """Record a batch of posts in one transaction."""
+        posted_at = posted_at or time.time()
+        paths = [os.path.abspath(p) for p in paths]
+        with self._lock:
+            known = dict(self._conn.execute(
+                f"SELECT path, sha256 FROM photos WHERE path IN ({','.join('?' * len(paths))})", paths
+            ).fetchall())
+        # Photos not cataloged yet (e.g. during the first sync) are hashed here,
+        # so the row added for them later can find this post by content
+        hashes = {}
+        for path in paths:
+            hashes[path] = known.get(path)
+            if hashes[path] is None:
+                try:
+                    hashes[path] = file_sha256(path)
+                except OSError:
+                    pass
+        with self._lock, self._conn:
+            for path in paths:
+                self._conn.execute(
+                    "INSERT INTO posts (path, sha256, posted_at) VALUES (?, ?, ?)",
+                    (path, hashes[path], posted_at)
+                )
+                self._conn.execute(
+                    "UPDATE photos SET last_posted_at = ?, post_count = post_count + 1 WHERE path = ?",
+                    (posted_at, path)
+                )
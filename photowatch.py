@@ -0,0 +1,329 @@
+import os
+import sys
+import time
+import select
+import struct
+import threading
+
+# Extensions the library index tracks (the poster filters this further)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
+
+# Change bursts (e.g. copying 200 photos) are folded into one notification:
+# it goes out once no event arrived for DEBOUNCE_SECONDS, or at the latest
+# DEBOUNCE_MAX_SECONDS after the first event of the burst
+DEBOUNCE_SECONDS = 0.3
+DEBOUNCE_MAX_SECONDS = 2.0
+POLL_INTERVAL_SECONDS = 2.0
+# A file not known to be closed counts as still being written while its mtime is this recent
+SETTLE_SECONDS = 1.0
+
+def is_image_file(filename):
+    """Return True if filename has one of the tracked image extensions."""
+    return filename.lower().endswith(IMAGE_EXTENSIONS)
+
+def scan_folder_stats(folder):
+    """Return {path: (size, mtime_ns)} for the images directly inside folder."""
+    photos = {}
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if is_image_file(entry.name) and entry.is_file():
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    photos[os.path.join(folder, entry.name)] = (stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        pass
+    return photos
+
+def scan_folder(folder):
+    """Return the set of image paths directly inside folder."""
+    return set(scan_folder_stats(folder))
+
+class PhotoLibraryIndex:
+    """
+    In-memory index of the photos in photos_dir and its direct subfolders.
+
+    The index is kept current by a watcher thread (inotify on Linux, polling
+    elsewhere) and can be read from any thread. Listeners are called from the
+    watcher thread as listener(folder, added, removed) after each debounced
+    burst of changes. A file that changed in place is reported as both
+    removed and added. Files that are still being written are left out
+    until they are closed or their mtime has settled.
+    """
+
+    def __init__(self, photos_dir, use_inotify=True, scan=True):
+        """
+        Args:
+            photos_dir (str): Library root
+            use_inotify (bool): Watch with inotify where available
+            scan (bool): Scan the library now; pass False to start empty and call rescan() later
+        """
+        self.photos_dir = os.path.abspath(photos_dir)
+        self._lock = threading.Lock()
+        self._folders = {}  # folder path -> {photo path: (size, mtime_ns)}
+        self._unsettled = set()  # Folders with files still being written, to be rescanned
+        self._listeners = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._use_inotify = use_inotify and sys.platform.startswith("linux")
+        if scan:
+            self.rescan()
+
+    # Reading
+
+    def subfolders(self):
+        """Return the sorted names of the subfolders of photos_dir."""
+        with self._lock:
+            return sorted(
+                os.path.basename(folder) for folder in self._folders
+                if folder != self.photos_dir
+            )
+
+    def photos(self, folder):
+        """Return the sorted photo paths in folder, scanning it once if it is not indexed."""
+        folder = os.path.abspath(folder)
+        with self._lock:
+            photos = self._folders.get(folder)
+            if photos is not None:
+                return sorted(photos)
+
+        # Folders outside photos_dir are not watched, so just list them
+        photos = scan_folder_stats(folder)
+        if os.path.dirname(folder) == self.photos_dir or folder == self.photos_dir:
+            with self._lock:
+                self._folders[folder] = photos
+        return sorted(photos)
+
+    # Updating
+
+    def add_listener(self, listener):
+        """Register listener(folder, added, removed) for index changes."""
+        self._listeners.append(listener)
+
+    def rescan(self, folders=None, finished=()):
+        """
+        Rescan folders (default: the whole library) and notify listeners of changes.
+
+        Args:
+            folders (iterable): Absolute folder paths to refresh, or None for everything
+            finished (iterable): Paths known to be completely written (closed or moved in)
+        """
+        finished = set(finished)
+        settle_before = time.time_ns() - int(SETTLE_SECONDS * 1e9)
+        if folders is None:
+            folders = {self.photos_dir}
+            try:
+                with os.scandir(self.photos_dir) as entries:
+                    folders.update(entry.path for entry in entries if entry.is_dir())
+            except OSError:
+                pass
+            with self._lock:
+                # Subfolders that vanished since the last full scan
+                folders.update(self._folders)
+
+        for folder in folders:
+            exists = os.path.isdir(folder)
+            scanned = scan_folder_stats(folder) if exists else {}
+            with self._lock:
+                known = folder in self._folders
+                previous = self._folders.get(folder, {})
+                photos = {}
+                unsettled = False
+                for path, stat in scanned.items():
+                    if stat == previous.get(path) or path in finished or stat[1] <= settle_before:
+                        photos[path] = stat
+                    else:
+                        # Still being written: keep what was indexed before, if anything
+                        unsettled = True
+                        if path in previous:
+                            photos[path] = previous[path]
+                if unsettled:
+                    self._unsettled.add(folder)
+                else:
+                    self._unsettled.discard(folder)
+                if exists:
+                    self._folders[folder] = photos
+                else:
+                    self._folders.pop(folder, None)
+            changed = {path for path, stat in photos.items() if path in previous and previous[path] != stat}
+            added = (photos.keys() - previous.keys()) | changed
+            removed = (previous.keys() - photos.keys()) | changed
+            if added or removed or exists != known:
+                self._notify(folder, added, removed)
+
+    def unsettled_folders(self):
+        """Return the folders whose last scan found files still being written."""
+        with self._lock:
+            return set(self._unsettled)
+
+    def _notify(self, folder, added, removed):
+        for listener in self._listeners:
+            try:
+                listener(folder, added, removed)
+            except Exception as e:
+                print(f"Photo index listener failed: {e}")
+
+    # Watching
+
+    def start(self):
+        """Start the background watcher thread."""
+        if self._thread is not None:
+            return
+        target = self._watch_inotify if self._use_inotify else self._watch_polling
+        self._thread = threading.Thread(target=target, name="photo-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the watcher thread."""
+        self._stop.set()
+
+    def _watch_polling(self):
+        """Fallback watcher: rescan folders whose directory mtime changed."""
+        mtimes = {}
+        while not self._stop.wait(POLL_INTERVAL_SECONDS):
+            with self._lock:
+                folders = set(self._folders)
+            folders.add(self.photos_dir)
+
+            changed = set()
+            for folder in folders:
+                try:
+                    mtime = os.stat(folder).st_mtime_ns
+                except OSError:
+                    mtime = None
+                if folder in mtimes and mtimes[folder] != mtime:
+                    changed.add(folder)
+                mtimes[folder] = mtime
+
+            # Appending to a file does not touch the folder's mtime, so
+            # folders with files still being written are checked every time
+            changed |= self.unsettled_folders()
+            if self.photos_dir in changed:
+                # A subfolder may have been created or removed
+                self.rescan()
+            elif changed:
+                self.rescan(changed)
+
+    def _watch_inotify(self):
+        """Linux watcher built on inotify; falls back to polling if it is unavailable."""
+        try:
+            inotify = _Inotify()
+        except OSError as e:
+            print(f"inotify unavailable, falling back to polling: {e}")
+            self._watch_polling()
+            return
+
+        try:
+            with self._lock:
+                folders = set(self._folders)
+            folders.add(self.photos_dir)
+            for folder in folders:
+                inotify.add_watch(folder)
+
+            pending = set()
+            finished = set()
+            deadline = None
+            burst_deadline = None
+            while not self._stop.is_set():
+                timeout = 1.0 if deadline is None else max(0.0, deadline - time.monotonic())
+                for folder, name, is_dir, closed in inotify.read(timeout):
+                    if is_dir and folder == self.photos_dir:
+                        # Subfolder created/removed: watch it and refresh its contents
+                        subfolder = os.path.join(folder, name)
+                        if os.path.isdir(subfolder):
+                            inotify.add_watch(subfolder)
+                        pending.add(subfolder)
+                    elif is_image_file(name):
+                        pending.add(folder)
+                        if closed:
+                            finished.add(os.path.join(folder, name))
+                    else:
+                        continue
+                    # Every event pushes the notification back, up to a cap per burst
+                    now = time.monotonic()
+                    if burst_deadline is None:
+                        burst_deadline = now + DEBOUNCE_MAX_SECONDS
+                    deadline = min(now + DEBOUNCE_SECONDS, burst_deadline)
+
+                if deadline is not None and time.monotonic() >= deadline:
+                    self.rescan(pending, finished)
+                    pending = set()
+                    finished = set()
+                    deadline = None
+                    burst_deadline = None
+                    # Files still being written are looked at again once their mtime may have settled
+                    unsettled = self.unsettled_folders()
+                    if unsettled:
+                        pending |= unsettled
+                        deadline = burst_deadline = time.monotonic() + SETTLE_SECONDS
+        finally:
+            inotify.close()
+
+class _Inotify:
+    """Minimal ctypes wrapper around the Linux inotify API."""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                  IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._libc = libc
+        self._fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._paths = {}  # watch descriptor -> folder
+
+    def add_watch(self, folder):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), self.WATCH_MASK)
+        if wd >= 0:
+            self._paths[wd] = folder
+
+    def read(self, timeout):
+        """
+        Yield (folder, name, is_dir, closed) for each event, waiting up to timeout seconds.
+
+        closed is True when the file was closed after writing or moved in,
+        i.e. it is complete.
+        """
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+
+        offset = 0
+        while offset + self.EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            folder = self._paths.get(wd)
+            if folder is None:
+                continue
+            if mask & self.IN_DELETE_SELF:
+                del self._paths[wd]
+                yield os.path.dirname(folder), os.path.basename(folder), True, False
+            elif name:
+                closed = bool(mask & (self.IN_CLOSE_WRITE | self.IN_MOVED_TO))
+                yield folder, name, bool(mask & self.IN_ISDIR), closed
+
+    def close(self):
+        os.close(self._fd)
@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import datetime
+import threading
+from appdata import data_path
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+def default_state_path():
+    """Return the per-user file remembering when each scheduled job last ran."""
+    return data_path("schedule-state.json")
+
+class ScheduledJob:
+    """
+    A recurring posting job from the schedule file.
+
+    Either every_minutes (a fixed interval) or at (daily "HH:MM" times,
+    optionally limited to some weekdays) says when it runs. Everything else
+    is passed on to the posting run.
+    """
+
+    def __init__(self, name, folder, num_photos=5, every_minutes=None, at=None, days=None, options=None):
+        if not every_minutes and not at:
+            raise ValueError(f"Job {name!r} needs 'every_minutes' or 'at'")
+        self.name = name
+        self.folder = folder
+        self.num_photos = num_photos
+        self.every_minutes = every_minutes
+        self.at = sorted(datetime.datetime.strptime(t, "%H:%M").time() for t in (at or []))
+        self.days = [WEEKDAYS.index(d.lower()[:3]) for d in days] if days else list(range(7))
+        self.options = options or {}
+
+    def next_run(self, last_run, now):
+        """
+        Return the UNIX time this job is next due.
+
+        A job that never ran is due right away: interval jobs now, daily jobs
+        at their latest slot up to now, so a cron caller of run_due() fires
+        them instead of always finding the next slot in the future. A slot
+        missed while nothing was running makes the job due once, not once
+        per missed slot.
+        """
+        if self.every_minutes:
+            return now if last_run is None else last_run + self.every_minutes * 60
+        if last_run is None:
+            latest = self._latest_slot(now)
+            if latest is not None:
+                return latest
+        after = datetime.datetime.fromtimestamp(last_run if last_run is not None else now)
+        for day_offset in range(8):
+            day = after.date() + datetime.timedelta(days=day_offset)
+            if day.weekday() not in self.days:
+                continue
+            for slot in self.at:
+                candidate = datetime.datetime.combine(day, slot)
+                if candidate > after:
+                    return candidate.timestamp()
+        return None
+
+    def _latest_slot(self, now):
+        """Return the UNIX time of the last slot at or before now, or None if there was none this week."""
+        before = datetime.datetime.fromtimestamp(now)
+        for day_offset in range(8):
+            day = before.date() - datetime.timedelta(days=day_offset)
+            if day.weekday() not in self.days:
+                continue
+            for slot in reversed(self.at):
+                candidate = datetime.datetime.combine(day, slot)
+                if candidate <= before:
+                    return candidate.timestamp()
+        return None
+
+    def __repr__(self):
+        return f"ScheduledJob({self.name!r}, {self.folder!r})"
+
+def load_schedule(config_path):
+    """
+    Read scheduled jobs from a JSON file.
+
+    The file holds {"jobs": [...]}; each job has a name, a folder, num_photos
+    and either every_minutes or at (a list of "HH:MM") with optional days
+    (e.g. ["mon", "fri"]). Other keys (headless, profile_dir, policy,
+    no_repeat_days, batch_size, accounts, max_concurrency, ...) are kept as
+    the job's options.
+    """
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    jobs = []
+    for entry in config.get("jobs", []):
+        entry = dict(entry)
+        jobs.append(ScheduledJob(
+            entry.pop("name"), entry.pop("folder"), entry.pop("num_photos", 5),
+            entry.pop("every_minutes", None), entry.pop("at", None), entry.pop("days", None), entry
+        ))
+    names = [job.name for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError("Job names in the schedule must be unique")
+    return jobs
+
+class Scheduler:
+    """
+    Runs scheduled jobs when they are due.
+
+    The time each job last ran is persisted, so restarting the scheduler (or
+    running it from cron with run_due()) neither repeats nor skips a slot.
+    Jobs run one at a time on the calling thread.
+    """
+
+    def __init__(self, jobs, run_job, state_path=None):
+        """
+        Args:
+            jobs (list): ScheduledJobs
+            run_job (callable): run_job(job) posts for one job and returns a result dict
+            state_path (str): Where last run times are kept (default: default_state_path())
+        """
+        self.jobs = jobs
+        self.run_job = run_job
+        self.state_path = state_path or default_state_path()
+        self._stop = threading.Event()
+        self._state = self._load_state()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._state, f, indent=1)
+        os.replace(tmp_path, self.state_path)
+
+    def next_runs(self, now=None):
+        """Return [(due_time, job)] sorted by due time."""
+        now = time.time() if now is None else now
+        runs = []
+        for job in self.jobs:
+            due = job.next_run(self._state.get(job.name, {}).get("last_run"), now)
+            if due is not None:
+                runs.append((due, job))
+        runs.sort(key=lambda item: item[0])
+        return runs
+
+    def run_due(self, now=None):
+        """Run every job that is due now and return their results."""
+        now = time.time() if now is None else now
+        results = []
+        for due, job in self.next_runs(now):
+            if due > now or self._stop.is_set():
+                break
+            started = time.time()
+            try:
+                result = self.run_job(job)
+            except Exception as e:
+                result = {"error": str(e)}
+            result = dict(result or {}, job=job.name, started_at=started, duration=time.time() - started)
+            # Recorded as having run even if it failed, so a broken job does not retry in a tight loop
+            self._state[job.name] = {"last_run": started, "last_result": result}
+            self._save_state()
+            results.append(result)
+        return results
+
+    def run_forever(self, on_result=None):
+        """Run jobs as they come due until stop() is called."""
+        while not self._stop.is_set():
+            for result in self.run_due():
+                if on_result is not None:
+                    on_result(result)
+            runs = self.next_runs()
+            if not runs:
+                return
+            # Wake up at the next due time, but at least once a minute to notice clock changes
+            self._stop.wait(min(60.0, max(1.0, runs[0][0] - time.time())))
+
+    def stop(self):
+        """Make run_forever() return after the current job."""
+        self._stop.set()
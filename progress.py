@@ -0,0 +1,114 @@
+import time
+import queue
+
+# Event kinds emitted by post_whatsapp_stories
+JOB_STARTED = "job_started"        # total: photos in the run
+PHOTO_STARTED = "photo_started"    # photos: sources going into one composer round trip
+PHOTO_UPLOADED = "photo_uploaded"  # photos: files handed to the file input
+PHOTO_SENT = "photo_sent"          # photos, elapsed: round trip seconds
+PHOTO_FAILED = "photo_failed"      # photos, error
+JOB_FINISHED = "job_finished"      # posted, cancelled
+
+class ProgressEvent:
+    """One structured progress update from the posting thread."""
+
+    __slots__ = ("kind", "time", "photos", "total", "elapsed", "error", "posted", "cancelled")
+
+    def __init__(self, kind, photos=(), total=None, elapsed=None, error=None, posted=None, cancelled=False):
+        self.kind = kind
+        self.time = time.monotonic()
+        self.photos = list(photos)
+        self.total = total
+        self.elapsed = elapsed
+        self.error = error
+        self.posted = posted
+        self.cancelled = cancelled
+
+    def __repr__(self):
+        return f"ProgressEvent({self.kind!r}, {len(self.photos)} photos)"
+
+class ProgressChannel:
+    """
+    Thread-safe queue of ProgressEvents from the poster to the UI.
+
+    The posting thread calls emit() and never blocks; the UI calls drain()
+    from a timer and handles everything that arrived since the last tick
+    at once.
+    """
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+
+    def emit(self, kind, **fields):
+        """Queue an event of kind; fields are ProgressEvent attributes."""
+        self._queue.put(ProgressEvent(kind, **fields))
+
+    def drain(self, max_items=1000):
+        """Return up to max_items queued events without waiting."""
+        events = []
+        try:
+            while len(events) < max_items:
+                events.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return events
+
+class ProgressTracker:
+    """Folds ProgressEvents into counts, throughput and ETA for display."""
+
+    def __init__(self):
+        self.total = 0
+        self.sent = 0
+        self.failed = 0
+        self.current = []
+        self.started_at = None
+        self.first_sent_at = None
+        self.first_sent_count = 0
+        self.last_sent_at = None
+        self.finished = False
+        self.cancelled = False
+
+    def apply(self, event):
+        """Update the state from one event."""
+        if event.kind == JOB_STARTED:
+            self.total = event.total or 0
+            self.started_at = event.time
+        elif event.kind in (PHOTO_STARTED, PHOTO_UPLOADED):
+            self.current = event.photos
+        elif event.kind == PHOTO_SENT:
+            self.sent += len(event.photos)
+            if self.first_sent_at is None:
+                self.first_sent_at = event.time
+                self.first_sent_count = len(event.photos)
+            self.last_sent_at = event.time
+            self.current = []
+        elif event.kind == PHOTO_FAILED:
+            self.failed += len(event.photos)
+            self.current = []
+        elif event.kind == JOB_FINISHED:
+            self.finished = True
+            self.cancelled = event.cancelled
+
+    @property
+    def done(self):
+        """Photos that are sent or failed."""
+        return self.sent + self.failed
+
+    def photos_per_minute(self):
+        """Posting rate since the job started, or None before the first photo is sent."""
+        if not self.sent or self.started_at is None:
+            return None
+        elapsed = (self.last_sent_at or time.monotonic()) - self.started_at
+        return 60.0 * self.sent / elapsed if elapsed > 0 else None
+
+    def eta_seconds(self):
+        """Estimated seconds until the remaining photos are done, or None if unknown."""
+        if not self.sent or self.first_sent_at is None:
+            return None
+        remaining = max(0, self.total - self.done)
+        # Measure from the first send, so browser start-up and login do not skew the estimate
+        if self.sent > self.first_sent_count:
+            per_photo = (self.last_sent_at - self.first_sent_at) / (self.sent - self.first_sent_count)
+        else:
+            per_photo = (self.first_sent_at - self.started_at) / self.first_sent_count
+        return remaining * per_photo
@@ -0,0 +1,240 @@
+import os
+import json
+import time
+import threading
+from appdata import data_path
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+# The last selector that worked for a step gets this long before the others are raced
+SHORT_TIMEOUT = 2.0
+POLL_FREQUENCY = 0.2
+
+# Checks every candidate in one script per poll tick and returns [index, element]
+# for the first usable match. __CHECKS__ is replaced with one arrow function per
+# candidate, so JSCLICK expressions run without eval() and CSP does not apply.
+RACE_SCRIPT_TEMPLATE = """
+const requireClickable = arguments[0];
+const checks = [
+__CHECKS__
+];
+function usable(el) {
+    if (!el || !(el instanceof Element)) { return false; }
+    if (!requireClickable) { return true; }
+    if (el.disabled) { return false; }
+    const rect = el.getBoundingClientRect();
+    const style = window.getComputedStyle(el);
+    return rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+}
+for (let i = 0; i < checks.length; i++) {
+    let el = null;
+    try { el = checks[i](); } catch (e) {}
+    if (usable(el)) { return [i, el]; }
+}
+return null;
+"""
+
+def default_stats_path():
+    """Return the per-user location of the persisted selector statistics."""
+    return data_path("selector-stats.json")
+
+def parse_selector(selector):
+    """Split a selector string into (kind, expression); kind is 'xpath', 'css' or 'js'."""
+    if selector.startswith("JSCLICK:"):
+        return "js", selector[8:]
+    if selector.startswith("CSS:"):
+        return "css", selector[4:]
+    return "xpath", selector
+
+def build_race_script(selectors):
+    """Build the script that checks all selectors in order in a single round trip."""
+    checks = []
+    for selector in selectors:
+        kind, expr = parse_selector(selector)
+        if kind == "xpath":
+            checks.append(
+                f"() => document.evaluate({json.dumps(expr)}, document, null, "
+                f"XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue"
+            )
+        elif kind == "css":
+            checks.append(f"() => document.querySelector({json.dumps(expr)})")
+        else:
+            checks.append(f"() => ({expr})")
+    return RACE_SCRIPT_TEMPLATE.replace("__CHECKS__", ",\n".join(checks))
+
+class SelectorResolver:
+    """
+    Finds page elements from lists of candidate selectors and learns which ones work.
+
+    Per step it records successes, failures and average latency of each
+    selector and persists them. The last selector that worked is tried first
+    with a short timeout; the remaining candidates, ordered by their record,
+    are then raced against each other in one in-page check per poll tick.
+    """
+
+    def __init__(self, stats_path=None, short_timeout=SHORT_TIMEOUT):
+        self.stats_path = stats_path or default_stats_path()
+        self.short_timeout = short_timeout
+        self._lock = threading.Lock()
+        self._scripts = {}
+        self._stats = self._load()
+
+    def _load(self):
+        try:
+            with open(self.stats_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """Write the statistics to disk."""
+        with self._lock:
+            data = json.dumps(self._stats, indent=1)
+        try:
+            os.makedirs(os.path.dirname(self.stats_path), exist_ok=True)
+            tmp_path = self.stats_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.stats_path)
+        except OSError as e:
+            print(f"Could not save selector statistics: {e}")
+
+    # Statistics
+
+    def record(self, step, selector, success, latency=None):
+        """Record one attempt of selector for step."""
+        with self._lock:
+            step_stats = self._stats.setdefault(step, {"last_good": None, "selectors": {}})
+            entry = step_stats["selectors"].setdefault(
+                selector, {"success": 0, "failure": 0, "avg_latency": None}
+            )
+            if success:
+                entry["success"] += 1
+                if latency is not None:
+                    previous = entry["avg_latency"]
+                    # Exponential moving average so the UI's current speed dominates
+                    entry["avg_latency"] = latency if previous is None else 0.7 * previous + 0.3 * latency
+                step_stats["last_good"] = selector
+            else:
+                entry["failure"] += 1
+                if step_stats["last_good"] == selector:
+                    step_stats["last_good"] = None
+
+    def last_good(self, step):
+        """Return the selector that most recently worked for step, if any."""
+        with self._lock:
+            return self._stats.get(step, {}).get("last_good")
+
+    def order(self, step, candidates):
+        """Return candidates ordered by success rate, keeping the given order for ties."""
+        with self._lock:
+            known = dict(self._stats.get(step, {}).get("selectors", {}))
+
+        def score(item):
+            position, selector = item
+            entry = known.get(selector)
+            if not entry:
+                # Untried selectors rank between proven and failing ones
+                return (-0.5, position)
+            attempts = entry["success"] + entry["failure"]
+            return (-(entry["success"] / attempts), position)
+
+        return [selector for _, selector in sorted(enumerate(candidates), key=score)]
+
+    # Resolving
+
+    def _race(self, driver, selectors, timeout, clickable):
+        """
+        Poll all selectors together until one yields a usable element or timeout passes.
+
+        Returns:
+            tuple: (selector, element, misses), misses being the number of polls that found nothing
+        """
+        key = (tuple(selectors), clickable)
+        script = self._scripts.get(key)
+        if script is None:
+            script = self._scripts[key] = build_race_script(selectors)
+        misses = [0]
+
+        def first_match(d):
+            result = d.execute_script(script, clickable)
+            if not result:
+                misses[0] += 1
+            return result or False
+
+        try:
+            index, element = WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(first_match)
+            return selectors[index], element, misses[0]
+        except TimeoutException:
+            return None, None, misses[0]
+
+    def find(self, driver, step, candidates, timeout, clickable=True, trace=None):
+        """
+        Find an element for step from candidates.
+
+        Args:
+            driver: Selenium WebDriver
+            step (str): Name of the step, used as the statistics key
+            candidates (list): Selector strings (XPath, "CSS:..." or "JSCLICK:<js expression>")
+            timeout (float): Overall deadline in seconds
+            clickable (bool): Require the element to be visible and enabled
+            trace (dict): Optional span (see steptrace) that receives the winning
+                "selector" and the number of "failed_attempts" (polls that found nothing)
+
+        Returns:
+            tuple: (element, selector), or (None, None) if nothing matched in time
+        """
+        start = time.monotonic()
+        deadline = start + timeout
+        remaining = list(candidates)
+        trace = trace if trace is not None else {}
+        trace.setdefault("failed_attempts", 0)
+        trace["selector"] = None
+
+        best = self.last_good(step)
+        if best in remaining:
+            selector, element, misses = self._race(driver, [best], min(self.short_timeout, timeout), clickable)
+            trace["failed_attempts"] += misses
+            if element is not None:
+                self.record(step, selector, True, time.monotonic() - start)
+                trace["selector"] = selector
+                return element, selector
+            print(f"Last working selector for '{step}' did not match: {best}")
+            self.record(step, best, False)
+            remaining.remove(best)
+
+        ordered = self.order(step, remaining)
+        if ordered:
+            selector, element, misses = self._race(
+                driver, ordered, max(0.0, deadline - time.monotonic()), clickable
+            )
+            trace["failed_attempts"] += misses
+            if element is not None:
+                self.record(step, selector, True, time.monotonic() - start)
+                trace["selector"] = selector
+                return element, selector
+
+        print(f"No selector matched for '{step}' within {timeout:.0f}s")
+        return None, None
+
+    def click(self, driver, step, candidates, timeout, trace=None):
+        """
+        Find a clickable element for step and click it.
+
+        Returns:
+            str: The selector that was clicked, or None
+        """
+        element, selector = self.find(driver, step, candidates, timeout, clickable=True, trace=trace)
+        if element is None:
+            return None
+        self.click_element(driver, element)
+        print(f"Clicked '{step}' with selector: {selector}")
+        return selector
+
+    def click_element(self, driver, element):
+        """Click an element found by find()."""
+        try:
+            element.click()
+        except WebDriverException:
+            # Overlays can intercept a native click; a DOM click still reaches the handler
+            driver.execute_script("arguments[0].click();", element)
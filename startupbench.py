@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from steptrace import percentile
+
+# Matches main.STARTUP_PROBE_ENV; main is not imported here, it would load tkinter and PIL
+STARTUP_PROBE_ENV = "STORY_POSTER_STARTUP_PROBE"
+LAUNCH_TIMEOUT = 120
+
+def script_dir():
+    return os.path.dirname(os.path.abspath(__file__))
+
+def default_frozen_path():
+    """The one-folder build from WhatsAppStoryPoster.spec, if it was built."""
+    name = "WhatsAppStoryPoster.exe" if sys.platform == "win32" else "WhatsAppStoryPoster"
+    path = os.path.join(script_dir(), "dist", "WhatsAppStoryPoster", name)
+    return path if os.path.exists(path) else None
+
+def drop_page_cache():
+    """
+    Evict file pages from the OS cache so the next launch reads from disk.
+
+    Only possible on Linux as root; returns False where it is not, and the
+    'cold' run then only starts without bytecode caches.
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        os.sync()
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+        return True
+    except OSError:
+        return False
+
+def launch(command, env, cwd):
+    """
+    Start the app once with the start-up probe and return its timings.
+
+    Returns:
+        dict: Seconds from launch to first_paint and to ready, and the heavy
+            modules that were already imported when the window painted
+    """
+    probe_dir = tempfile.mkdtemp(prefix="story-startup-")
+    probe_path = os.path.join(probe_dir, "probe.json")
+    env = dict(env, **{STARTUP_PROBE_ENV: probe_path})
+    try:
+        start = time.time()
+        completed = subprocess.run(command, env=env, cwd=cwd, timeout=LAUNCH_TIMEOUT,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=False)
+        try:
+            with open(probe_path, "r", encoding="utf-8") as f:
+                probe = json.load(f)
+        except (OSError, ValueError):
+            error = completed.stderr.decode(errors="replace").strip().splitlines()
+            raise RuntimeError(f"{command[0]} exited without writing start-up timings: {error[-1] if error else ''}")
+        return {
+            "first_paint": probe["first_paint"] - start,
+            "ready": probe["ready"] - start,
+            "modules_at_paint": probe.get("modules_at_paint", []),
+        }
+    finally:
+        shutil.rmtree(probe_dir, ignore_errors=True)
+
+def run_target(name, command, runs, fresh_bytecode=False):
+    """
+    Measure one cold and several warm launches of a build.
+
+    The cold launch follows a page cache drop (when permitted) and, for the
+    source run, uses an empty bytecode cache so every module is compiled again.
+    """
+    env = dict(os.environ)
+    pycache_dir = None
+    if fresh_bytecode:
+        pycache_dir = tempfile.mkdtemp(prefix="story-pycache-")
+        env["PYTHONPYCACHEPREFIX"] = pycache_dir
+    try:
+        page_cache_dropped = drop_page_cache()
+        cold = launch(command, env, script_dir())
+        warm = [launch(command, env, script_dir()) for _ in range(runs)]
+    finally:
+        if pycache_dir:
+            shutil.rmtree(pycache_dir, ignore_errors=True)
+
+    first_paints = [run["first_paint"] for run in warm]
+    readies = [run["ready"] for run in warm]
+    return {
+        "target": name,
+        "command": command,
+        "page_cache_dropped": page_cache_dropped,
+        "cold_first_paint": cold["first_paint"],
+        "cold_ready": cold["ready"],
+        "warm_first_paint_p50": percentile(first_paints, 0.5),
+        "warm_first_paint_p95": percentile(first_paints, 0.95),
+        "warm_ready_p50": percentile(readies, 0.5),
+        "warm_runs": runs,
+        "modules_at_paint": cold["modules_at_paint"],
+    }
+
+def format_results(results):
+    """Format target results as a table."""
+    def sec(value):
+        return f"{value:>10.3f}s" if value is not None else f"{'-':>11}"
+
+    lines = [
+        f"{'target':<10}{'cold paint':>11}{'cold ready':>11}{'warm p50':>11}{'warm p95':>11}"
+        f"{'ready p50':>11}  heavy modules at paint"
+    ]
+    for r in results:
+        lines.append(
+            f"{r['target']:<10}{sec(r['cold_first_paint'])}{sec(r['cold_ready'])}"
+            f"{sec(r['warm_first_paint_p50'])}{sec(r['warm_first_paint_p95'])}{sec(r['warm_ready_p50'])}"
+            f"  {', '.join(r['modules_at_paint']) or '-'}"
+        )
+    if any(not r["page_cache_dropped"] for r in results):
+        lines.append("Note: the OS page cache could not be dropped (needs root on Linux); cold runs may be warm-ish.")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Measure cold and warm time-to-first-paint of the GUI (needs a display)."
+    )
+    parser.add_argument("--runs", type=int, default=5, help="Warm launches per target")
+    parser.add_argument("--frozen", action="append",
+                        help="Path of a frozen build to measure (repeatable; default: dist/ one-folder build)")
+    parser.add_argument("--no-source", action="store_true", help="Skip the run from source")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    targets = []
+    if not args.no_source:
+        targets.append(("source", [sys.executable, os.path.join(script_dir(), "main.py")], True))
+    frozen = args.frozen or [p for p in [default_frozen_path()] if p]
+    for i, path in enumerate(frozen, 1):
+        name = "frozen" if len(frozen) == 1 else f"frozen-{i}"
+        targets.append((name, [os.path.abspath(path)], False))
+    if not targets:
+        parser.error("nothing to measure")
+
+    results = []
+    for name, command, fresh_bytecode in targets:
+        print(f"Launching {name}...", file=sys.stderr)
+        results.append(run_target(name, command, args.runs, fresh_bytecode))
+    print(json.dumps(results, indent=1) if args.json else format_results(results))
+
+if __name__ == "__main__":
+    main()
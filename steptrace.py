@@ -0,0 +1,210 @@
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from appdata import data_path
+
+def default_trace_path():
+    """Return the per-user JSON-lines file that posting runs append their step traces to."""
+    return data_path("traces.jsonl")
+
+def percentile(values, fraction):
+    """Return the fraction (0..1) percentile of values, interpolating between ranks."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+class StepTracer:
+    """
+    Records every step of a posting run as a structured span.
+
+    Each span has the step name, start time, duration, whether it raised,
+    the selector that won and how many selector checks missed before it, and
+    is appended as one JSON line to trace_path. Durations are also kept in
+    memory for the end-of-run summary.
+    """
+
+    def __init__(self, trace_path=None, run_id=None):
+        self.trace_path = default_trace_path() if trace_path is None else trace_path
+        self.run_id = run_id or time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:8]
+        self.durations = {}
+        self._lock = threading.Lock()
+        self._started = time.time()
+        if self.trace_path:
+            os.makedirs(os.path.dirname(self.trace_path), exist_ok=True)
+
+    def _write(self, record):
+        if not self.trace_path:
+            return
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        try:
+            with self._lock, open(self.trace_path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            print(f"Could not write trace: {e}")
+
+    @contextmanager
+    def step(self, name, **fields):
+        """
+        Time the enclosed block as step name.
+
+        Yields the span dict; the block can add fields such as "selector" or
+        "failed_attempts" to it (SelectorResolver.find fills those in when
+        given the span as trace).
+        """
+        span = {"run_id": self.run_id, "step": name, "start": time.time()}
+        span.update(fields)
+        start = time.monotonic()
+        try:
+            yield span
+        except BaseException as e:
+            span["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span["duration"] = time.monotonic() - start
+            with self._lock:
+                self.durations.setdefault(name, []).append(span["duration"])
+            self._write(span)
+
+    def record(self, name, duration, **fields):
+        """Record a step that was timed elsewhere."""
+        with self._lock:
+            self.durations.setdefault(name, []).append(duration)
+        self._write(dict({"run_id": self.run_id, "step": name, "start": time.time() - duration,
+                          "duration": duration}, **fields))
+
+    def finish(self, **fields):
+        """Append the run's closing record (e.g. photos posted)."""
+        self._write(dict({"run_id": self.run_id, "event": "run", "start": self._started,
+                          "duration": time.time() - self._started}, **fields))
+
+    def capture_performance_log(self, driver):
+        """
+        Save Chrome's performance log next to the trace file.
+
+        Only has entries if the browser was started with performance logging
+        (BrowserSession(performance_log=True)).
+
+        Returns:
+            str: Path of the written log, or None
+        """
+        if not self.trace_path:
+            return None
+        try:
+            entries = driver.get_log("performance")
+        except Exception as e:
+            print(f"Could not read the Chrome performance log: {e}")
+            return None
+        if not entries:
+            return None
+        perf_dir = os.path.join(os.path.dirname(self.trace_path), "perf")
+        os.makedirs(perf_dir, exist_ok=True)
+        path = os.path.join(perf_dir, f"{self.run_id}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        return path
+
+    def summary(self):
+        """Return one line per step of this run with count, average and total seconds."""
+        lines = []
+        for name, values in self.durations.items():
+            lines.append(
+                f"  {name:<14} n={len(values):<3} avg={sum(values) / len(values):6.2f}s total={sum(values):6.2f}s"
+            )
+        return "\n".join(lines)
+
+def load_spans(trace_path=None, last_runs=None):
+    """
+    Read the step spans from a trace file.
+
+    Args:
+        trace_path (str): Trace file (default: default_trace_path())
+        last_runs (int): Only spans of the newest last_runs runs
+
+    Returns:
+        list: Span dicts in file order
+    """
+    spans = []
+    try:
+        with open(trace_path or default_trace_path(), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if "step" in record:
+                    spans.append(record)
+    except OSError:
+        return []
+    if last_runs:
+        run_ids = list(dict.fromkeys(span["run_id"] for span in spans))[-last_runs:]
+        keep = set(run_ids)
+        spans = [span for span in spans if span["run_id"] in keep]
+    return spans
+
+def load_runs(trace_path=None):
+    """Return the closing run records (see StepTracer.finish) from a trace file."""
+    runs = []
+    try:
+        with open(trace_path or default_trace_path(), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("event") == "run":
+                    runs.append(record)
+    except OSError:
+        return []
+    return runs
+
+def summarize(spans):
+    """
+    Aggregate spans per step across runs.
+
+    Returns:
+        dict: step -> {"n", "errors", "p50", "p95", "max", "failed_attempts"}, in first-seen order
+    """
+    by_step = {}
+    for span in spans:
+        by_step.setdefault(span["step"], []).append(span)
+    report = {}
+    for step, entries in by_step.items():
+        durations = [entry["duration"] for entry in entries]
+        report[step] = {
+            "n": len(entries),
+            "errors": sum(1 for entry in entries if entry.get("error")),
+            "p50": percentile(durations, 0.5),
+            "p95": percentile(durations, 0.95),
+            "max": max(durations),
+            "failed_attempts": sum(entry.get("failed_attempts", 0) for entry in entries),
+        }
+    return report
+
+def format_report(report):
+    """Format summarize() output as a table."""
+    lines = [f"{'step':<16}{'n':>6}{'p50':>9}{'p95':>9}{'max':>9}{'errors':>8}{'misses':>8}"]
+    for step, row in report.items():
+        lines.append(
+            f"{step:<16}{row['n']:>6}{row['p50']:>8.2f}s{row['p95']:>8.2f}s{row['max']:>8.2f}s"
+            f"{row['errors']:>8}{row['failed_attempts']:>8}"
+        )
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    # python steptrace.py [trace_file] [last_runs]
+    path = sys.argv[1] if len(sys.argv) > 1 else None
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    spans = load_spans(path, runs)
+    if not spans:
+        print("No traces recorded yet.")
+    else:
+        print(format_report(summarize(spans)))
@@ -0,0 +1,233 @@
+import os
+import queue
+import tempfile
+import threading
+import collections
+from concurrent.futures import ProcessPoolExecutor
+from photolibrary import file_sha256
+
+# Story media settings
+STORY_SIZE = (1080, 1920)          # Portrait story resolution (width, height)
+TARGET_BYTES = 700 * 1024          # Aim for at most this many bytes per image
+MIN_QUALITY = 60
+MAX_QUALITY = 90
+OUTPUT_FORMAT = "JPEG"             # "JPEG" or "WEBP"
+
+def default_media_cache_dir():
+    """Return the temp directory where optimized story images are cached."""
+    return os.path.join(tempfile.gettempdir(), "WhatsAppStoryPoster", "story-media")
+
+def output_path_for(src_path, cache_dir, output_format=OUTPUT_FORMAT, content_hash=None):
+    """Return the cache path for src_path; the name is derived from its content hash."""
+    content_hash = content_hash or file_sha256(src_path)
+    ext = ".webp" if output_format == "WEBP" else ".jpg"
+    settings = f"{STORY_SIZE[0]}x{STORY_SIZE[1]}_{TARGET_BYTES // 1024}k"
+    return os.path.join(cache_dir, f"{content_hash[:32]}_{settings}{ext}")
+
+def optimize_story_image(src_path, cache_dir=None, output_format=OUTPUT_FORMAT, content_hash=None):
+    """
+    Produce a story-sized, metadata-free copy of src_path.
+
+    The image is rotated according to its EXIF orientation, scaled down to fit
+    the story resolution, flattened to RGB and re-encoded at the highest
+    quality that stays under TARGET_BYTES. Results are cached by content hash,
+    so the same photo is only processed once.
+
+    Args:
+        src_path (str): Original photo
+        cache_dir (str): Directory for optimized files (default: a temp directory)
+        output_format (str): "JPEG" or "WEBP"
+        content_hash (str): SHA-256 of src_path if the caller already computed it
+
+    Returns:
+        str: Path of the optimized file
+    """
+    # Imported here so worker processes only pay for PIL when they need it
+    import io
+    from PIL import Image, ImageOps
+
+    cache_dir = cache_dir or default_media_cache_dir()
+    out_path = output_path_for(src_path, cache_dir, output_format, content_hash)
+    if os.path.exists(out_path):
+        return out_path
+
+    with Image.open(src_path) as img:
+        img.draft("RGB", STORY_SIZE)
+        img = ImageOps.exif_transpose(img)
+
+        # Fit inside the story frame in the photo's own orientation
+        box = STORY_SIZE if img.height >= img.width else (STORY_SIZE[1], STORY_SIZE[0])
+        img.thumbnail(box, Image.LANCZOS)
+
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, "white")
+            background.paste(img, mask=img.getchannel("A"))
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+
+        # Binary search for the best quality under the byte budget; no exif/icc is
+        # passed to save(), so metadata is stripped
+        best = smallest = None
+        low, high = MIN_QUALITY, MAX_QUALITY
+        while low <= high:
+            quality = (low + high) // 2
+            buffer = io.BytesIO()
+            img.save(buffer, output_format, quality=quality, optimize=True)
+            if smallest is None or buffer.tell() < smallest.tell():
+                smallest = buffer
+            if buffer.tell() <= TARGET_BYTES:
+                best = buffer
+                low = quality + 1
+            else:
+                high = quality - 1
+        # Nothing fit the budget: settle for the lowest quality tried
+        best = best or smallest
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = out_path + f".{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(best.getvalue())
+    os.replace(tmp_path, out_path)
+    return out_path
+
+class PreparedMedia:
+    """A photo that went through the pipeline, ready to be handed to the browser."""
+
+    def __init__(self, source, upload_path=None, sha256=None, error=None):
+        self.source = source
+        self.upload_path = upload_path
+        self.sha256 = sha256
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+def validate_photo(src_path):
+    """Raise if src_path is missing or not a readable image (header check only)."""
+    from PIL import Image
+    if not os.path.isfile(src_path):
+        raise FileNotFoundError(f"Photo not found: {src_path}")
+    with Image.open(src_path) as img:
+        img.verify()
+
+class MediaPipeline:
+    """
+    Background producer that prepares photos ahead of the posting loop.
+
+    A producer thread resolves, validates, hashes and optimizes the photos in
+    order, keeping up to depth optimizations in flight in a process pool, and
+    puts finished PreparedMedia on a bounded queue. The Selenium thread takes
+    ready items with take(), so CPU work on the next photos overlaps with the
+    browser's latency on the current one.
+    """
+
+    _END = object()
+
+    def __init__(self, photo_paths, depth=4, optimize=True, cache_dir=None, max_workers=None,
+                 output_format=OUTPUT_FORMAT):
+        self.photo_paths = list(photo_paths)
+        self.depth = max(1, depth)
+        self.optimize = optimize
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers or min(self.depth, os.cpu_count() or 2)
+        self.output_format = output_format
+        self._queue = queue.Queue(maxsize=self.depth)
+        self._stop = threading.Event()
+        self._finished = False
+        self._thread = None
+        self.skipped = []  # PreparedMedia that failed validation, in the order take() met them
+
+    def start(self):
+        """Start preparing photos in the background."""
+        self._thread = threading.Thread(target=self._produce, name="media-pipeline", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        """Stop the producer; photos not yet taken are dropped."""
+        self._stop.set()
+        # Unblock a producer waiting on a full queue
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _prepare(self, path):
+        """Validate and hash one photo; returns its SHA-256 or raises."""
+        validate_photo(path)
+        return file_sha256(path)
+
+    def _produce(self):
+        executor = ProcessPoolExecutor(max_workers=self.max_workers) if self.optimize else None
+        in_flight = collections.deque()
+        try:
+            for path in self.photo_paths:
+                if self._stop.is_set():
+                    return
+                try:
+                    sha256 = self._prepare(path)
+                except Exception as e:
+                    in_flight.append((path, None, None, e))
+                else:
+                    future = None
+                    if executor is not None:
+                        future = executor.submit(
+                            optimize_story_image, path, self.cache_dir, self.output_format, sha256
+                        )
+                    in_flight.append((path, sha256, future, None))
+
+                # Keep at most depth photos being optimized ahead of the consumer
+                while len(in_flight) >= self.depth:
+                    if not self._put(self._collect(*in_flight.popleft())):
+                        return
+            while in_flight:
+                if not self._put(self._collect(*in_flight.popleft())):
+                    return
+        finally:
+            self._put(self._END)
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def _collect(self, path, sha256, future, error):
+        """Turn one in-flight entry into a PreparedMedia, waiting for its optimization."""
+        if error is not None:
+            print(f"Skipping {os.path.basename(path)}: {error}")
+            return PreparedMedia(path, error=error)
+        if future is None:
+            return PreparedMedia(path, path, sha256)
+        try:
+            return PreparedMedia(path, future.result(), sha256)
+        except Exception as e:
+            print(f"Could not optimize {os.path.basename(path)}, uploading original: {e}")
+            return PreparedMedia(path, path, sha256)
+
+    def take(self, count):
+        """
+        Return up to count prepared photos, blocking until they are ready.
+
+        Photos that failed validation are skipped and collected in skipped.
+        An empty list means the pipeline is exhausted.
+        """
+        items = []
+        while len(items) < count and not self._finished:
+            item = self._queue.get()
+            if item is self._END:
+                self._finished = True
+            elif item.ok:
+                items.append(item)
+            else:
+                self.skipped.append(item)
+        return items
@@ -0,0 +1,171 @@
+import time
+import random
+from photodedup import take_distinct
+
+# Selection policies
+POLICY_RANDOM = "random"                    # Uniform, no memory of earlier runs
+POLICY_LEAST_RECENT = "least_recent"        # Never posted first, then the longest ago
+POLICY_WEIGHTED_AGE = "weighted_age"        # Random, favoring photos not posted for a long time
+POLICY_WEIGHTED_MANUAL = "weighted_manual"  # Random, proportional to each photo's manual weight
+DEFAULT_POLICY = POLICY_WEIGHTED_AGE
+
+DAY_SECONDS = 24 * 60 * 60
+# Age given to never-posted photos by POLICY_WEIGHTED_AGE
+NEVER_POSTED_AGE_DAYS = 365
+
+class PhotoHistory:
+    """Posting history of one photo as the selection policies see it."""
+
+    __slots__ = ("last_posted_at", "post_count", "weight")
+
+    def __init__(self, last_posted_at=None, post_count=0, weight=1.0):
+        self.last_posted_at = last_posted_at
+        self.post_count = post_count
+        self.weight = 1.0 if weight is None else weight
+
+NO_HISTORY = PhotoHistory()
+
+def history_from_catalog(catalog, folder):
+    """Return path -> PhotoHistory for every cataloged photo in folder."""
+    return {
+        path: PhotoHistory(last_posted_at, post_count, weight)
+        for path, last_posted_at, post_count, weight in catalog.rotation_info(folder)
+    }
+
+class WeightedSampler:
+    """
+    Draws items without replacement with probability proportional to their weight.
+
+    Weights live in a Fenwick tree: building it is O(n) and every draw is an
+    O(log n) prefix-sum descent followed by an O(log n) update that removes
+    the drawn item, so k draws from n items cost O(n + k log n).
+    """
+
+    def __init__(self, items, weights):
+        self.items = list(items)
+        self._weights = [max(0.0, float(w)) for w in weights]
+        n = len(self.items)
+        self._tree = [0.0] * (n + 1)
+        for i, weight in enumerate(self._weights, 1):
+            self._tree[i] += weight
+            parent = i + (i & -i)
+            if parent <= n:
+                self._tree[parent] += self._tree[i]
+        self.total = sum(self._weights)
+        self._top_bit = 1 << max(0, n.bit_length() - 1) if n else 0
+
+    def _update(self, index, delta):
+        i = index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _find(self, target):
+        """Return the index whose cumulative weight range contains target."""
+        position = 0
+        step = self._top_bit
+        while step:
+            nxt = position + step
+            if nxt < len(self._tree) and self._tree[nxt] <= target:
+                position = nxt
+                target -= self._tree[nxt]
+            step >>= 1
+        return min(position, len(self.items) - 1)
+
+    def draw(self, rng=random):
+        """Yield items one by one until every item with positive weight was drawn."""
+        remaining = sum(1 for w in self._weights if w > 0)
+        while remaining:
+            index = self._find(rng.random() * self.total)
+            # Float rounding can land on an already drawn item; step to a live neighbour
+            if self._weights[index] <= 0:
+                live = [i for i, w in enumerate(self._weights) if w > 0]
+                index = min(live, key=lambda i: abs(i - index))
+            weight = self._weights[index]
+            self._weights[index] = 0.0
+            self._update(index, -weight)
+            self.total -= weight
+            remaining -= 1
+            yield self.items[index]
+
+# Policies map (candidates, history, now, rng) to an iterable of candidates in
+# the order they should be picked; selection stops once it has enough.
+
+def order_random(candidates, history, now, rng):
+    order = list(candidates)
+    rng.shuffle(order)
+    return order
+
+def order_least_recent(candidates, history, now, rng):
+    # Ties (e.g. all never posted) are broken randomly, not alphabetically
+    keyed = [(history.get(path, NO_HISTORY).last_posted_at or 0.0, rng.random(), path) for path in candidates]
+    keyed.sort()
+    return [path for _, _, path in keyed]
+
+def order_weighted_age(candidates, history, now, rng):
+    weights = []
+    for path in candidates:
+        entry = history.get(path, NO_HISTORY)
+        if entry.last_posted_at is None:
+            age_days = NEVER_POSTED_AGE_DAYS
+        else:
+            age_days = max(0.0, (now - entry.last_posted_at) / DAY_SECONDS)
+        weights.append(entry.weight * (1.0 + age_days))
+    return WeightedSampler(candidates, weights).draw(rng)
+
+def order_weighted_manual(candidates, history, now, rng):
+    weights = [history.get(path, NO_HISTORY).weight for path in candidates]
+    return WeightedSampler(candidates, weights).draw(rng)
+
+POLICIES = {
+    POLICY_RANDOM: order_random,
+    POLICY_LEAST_RECENT: order_least_recent,
+    POLICY_WEIGHTED_AGE: order_weighted_age,
+    POLICY_WEIGHTED_MANUAL: order_weighted_manual,
+}
+
+def register_policy(name, order_func):
+    """Add a selection policy; order_func(candidates, history, now, rng) returns candidates in pick order."""
+    POLICIES[name] = order_func
+
+def select_photos(candidates, count, policy=DEFAULT_POLICY, history=None, no_repeat_days=None,
+                  dedup_index=None, now=None, rng=random):
+    """
+    Choose count photos to post from candidates.
+
+    Args:
+        candidates (list): Photo paths to choose from
+        count (int): Photos wanted
+        policy (str): Name of a policy in POLICIES
+        history (dict): path -> PhotoHistory; photos without an entry count as never posted
+        no_repeat_days (float): Leave out photos posted within this many days
+        dedup_index (DuplicateIndex): If given, no two picks are duplicates of each other
+        now (float): Current UNIX time (for tests and replays)
+        rng: Source of randomness
+
+    Returns:
+        list: Up to count photos; fewer if the filters leave too few candidates
+    """
+    try:
+        order_func = POLICIES[policy]
+    except KeyError:
+        raise ValueError(f"Unknown selection policy: {policy!r}")
+    history = history or {}
+    now = time.time() if now is None else now
+
+    if no_repeat_days:
+        cutoff = now - no_repeat_days * DAY_SECONDS
+        candidates = [
+            path for path in candidates
+            if (history.get(path, NO_HISTORY).last_posted_at or 0.0) < cutoff
+        ]
+
+    ordered = order_func(candidates, history, now, rng)
+    if dedup_index is not None:
+        return take_distinct(ordered, count, dedup_index)
+    picked = []
+    for path in ordered:
+        if len(picked) >= count:
+            break
+        picked.append(path)
+    return picked
@@ -0,0 +1,385 @@
+import os
+import json
+import hashlib
+import threading
+import time
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+# Default cache settings
+THUMBNAIL_SIZE = 120
+CACHE_MAX_BYTES = 200 * 1024 * 1024  # 200 MB of pre-scaled thumbnails
+
+def default_cache_dir():
+    """Return the per-user directory used for cached thumbnails."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "WhatsAppStoryPoster", "thumbnails")
+
+class ThumbnailCache:
+    """
+    Content-addressed on-disk cache of pre-scaled thumbnails.
+
+    Entries are keyed on the source path, its size and its mtime, so an edited
+    or replaced photo produces a new key and the stale entry is regenerated.
+    The total size of the cache is bounded; least recently used entries are
+    evicted first.
+    """
+
+    INDEX_NAME = "index.json"
+
+    def __init__(self, cache_dir=None, max_bytes=CACHE_MAX_BYTES, thumbnail_size=THUMBNAIL_SIZE):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.thumbnail_size = thumbnail_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._index_path = os.path.join(self.cache_dir, self.INDEX_NAME)
+        # key -> {"path", "bytes", "atime"}; also maps each source path to its current key
+        self._entries = {}
+        self._keys_by_path = {}
+        self._total_bytes = 0
+        self._load_index()
+
+    def _load_index(self):
+        """Read the index file, dropping entries whose files have disappeared."""
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+
+        for key, entry in entries.items():
+            if os.path.exists(self._entry_file(key)):
+                self._entries[key] = entry
+                self._keys_by_path[entry["path"]] = key
+                self._total_bytes += entry["bytes"]
+
+    def _entry_file(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".png")
+
+    def make_key(self, file_path, stat=None):
+        """Build the cache key for a file from its path, size and mtime."""
+        stat = stat or os.stat(file_path)
+        raw = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}|{self.thumbnail_size}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, file_path):
+        """
+        Return a thumbnail for file_path as a PIL image, decoding the source only on a miss.
+
+        Args:
+            file_path (str): Path to the source photo
+
+        Returns:
+            PIL.Image.Image: The thumbnail, at most thumbnail_size on each side
+        """
+        abs_path = os.path.abspath(file_path)
+        key = self.make_key(abs_path)
+        cached_file = self._entry_file(key)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry is not None:
+            try:
+                img = Image.open(cached_file)
+                img.load()
+                with self._lock:
+                    entry["atime"] = time.time()
+                    self._dirty = True
+                    self.hits += 1
+                return img
+            except OSError:
+                # Cached file is corrupt or was removed behind our back
+                self._forget(key)
+
+        img = self.render(abs_path)
+        self.put(abs_path, key, img)
+        with self._lock:
+            self.misses += 1
+        return img
+
+    def render(self, file_path):
+        """Decode file_path and scale it down to a thumbnail."""
+        img = Image.open(file_path)
+        # Let the JPEG decoder skip most of the pixels up front
+        img.draft("RGB", (self.thumbnail_size, self.thumbnail_size))
+        img.thumbnail((self.thumbnail_size, self.thumbnail_size))
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        return img
+
+    def put(self, file_path, key, img):
+        """Store a rendered thumbnail and evict old entries if the cache is full."""
+        cached_file = self._entry_file(key)
+        try:
+            os.makedirs(os.path.dirname(cached_file), exist_ok=True)
+            tmp_file = cached_file + ".tmp"
+            img.save(tmp_file, "PNG")
+            os.replace(tmp_file, cached_file)
+            size = os.path.getsize(cached_file)
+        except OSError as e:
+            print(f"Could not write thumbnail cache entry for {file_path}: {e}")
+            return
+
+        with self._lock:
+            # A new key for an existing path means the old entry is stale
+            old_key = self._keys_by_path.get(file_path)
+            if old_key and old_key != key:
+                self._remove_entry(old_key)
+            if key in self._entries:
+                self._total_bytes -= self._entries[key]["bytes"]
+            self._entries[key] = {"path": file_path, "bytes": size, "atime": time.time()}
+            self._keys_by_path[file_path] = key
+            self._total_bytes += size
+            self._dirty = True
+            self._evict()
+
+    def _forget(self, key):
+        with self._lock:
+            self._remove_entry(key)
+
+    def _remove_entry(self, key):
+        """Drop a key from the index and delete its file. Caller holds the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._total_bytes -= entry["bytes"]
+        if self._keys_by_path.get(entry["path"]) == key:
+            del self._keys_by_path[entry["path"]]
+        try:
+            os.remove(self._entry_file(key))
+        except OSError:
+            pass
+        self._dirty = True
+
+    def _evict(self):
+        """Remove least recently used entries until the cache fits max_bytes. Caller holds the lock."""
+        if self._total_bytes <= self.max_bytes:
+            return
+        for key in sorted(self._entries, key=lambda k: self._entries[k]["atime"]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._remove_entry(key)
+
+    def save(self):
+        """Write the index to disk if it changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._entries)
+            self._dirty = False
+        try:
+            tmp_path = self._index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self._index_path)
+        except OSError as e:
+            print(f"Could not save thumbnail cache index: {e}")
+
+    def reset_stats(self):
+        """Reset the hit/miss counters."""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats_text(self):
+        """Short hit/miss summary for the status bar."""
+        return f"Önbellek: {self.hits} isabet, {self.misses} ıska"
+
+class ThumbnailLoader:
+    """
+    Decodes thumbnails on a thread pool and hands them back to the Tk thread.
+
+    Finished thumbnails are collected on a queue that is drained from a
+    root.after tick, so callbacks always run on the Tk main thread. Starting a
+    new batch cancels whatever is left of the previous one.
+    """
+
+    POLL_INTERVAL_MS = 30
+    MAX_PER_TICK = 40
+
+    def __init__(self, root, cache, max_workers=None):
+        self.root = root
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or min(8, os.cpu_count() or 2),
+            thread_name_prefix="thumbnail"
+        )
+        self._results = queue.Queue()
+        self._batch = 0
+        self._futures = {}
+        self._active = False
+        self._on_ready = None
+        self._on_done = None
+        self._polling = False
+
+    def load(self, paths, on_ready, on_done=None):
+        """
+        Start a new batch of thumbnails, cancelling any batch still running.
+
+        Args:
+            paths (list): Photo paths, in the order they should be decoded
+            on_ready (callable): Called as on_ready(path, image, error) on the Tk thread
+            on_done (callable): Called with no arguments whenever the batch goes idle
+        """
+        self.cancel()
+        self._on_ready = on_ready
+        self._on_done = on_done
+        self.request(paths)
+
+    def request(self, paths):
+        """
+        Retarget the current batch to paths.
+
+        Queued decodes for paths that are no longer wanted are cancelled and
+        paths that are not queued yet are submitted, in order.
+        """
+        wanted = set(paths)
+        for path, future in list(self._futures.items()):
+            if path not in wanted and future.cancel():
+                del self._futures[path]
+
+        batch = self._batch
+        for path in paths:
+            if path not in self._futures:
+                self._futures[path] = self.executor.submit(self._decode, batch, path)
+                self._active = True
+
+        if self._active and not self._polling:
+            self._polling = True
+            self.root.after(self.POLL_INTERVAL_MS, self._drain)
+
+    def cancel(self):
+        """Drop the current batch; results still in flight are discarded."""
+        self._batch += 1
+        for future in self._futures.values():
+            future.cancel()
+        self._futures = {}
+        self._active = False
+        self._on_ready = None
+        self._on_done = None
+
+    def shutdown(self):
+        """Cancel outstanding work and stop the worker threads."""
+        self.cancel()
+        self.executor.shutdown(wait=False)
+
+    def _decode(self, batch, path):
+        """Worker-thread side: decode one thumbnail unless its batch was cancelled."""
+        if batch != self._batch:
+            return
+        try:
+            self._results.put((batch, path, self.cache.get(path), None))
+        except Exception as e:
+            self._results.put((batch, path, None, e))
+
+    def _drain(self):
+        """Tk-thread side: deliver a bounded number of finished thumbnails per tick."""
+        delivered = 0
+        while delivered < self.MAX_PER_TICK:
+            try:
+                batch, path, img, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if batch != self._batch:
+                continue
+            delivered += 1
+            self._futures.pop(path, None)
+            if self._on_ready:
+                self._on_ready(path, img, error)
+
+        if self._futures or not self._results.empty():
+            self.root.after(self.POLL_INTERVAL_MS, self._drain)
+            return
+
+        self._polling = False
+        if self._active:
+            self._active = False
+            self.cache.save()
+            if self._on_done:
+                self._on_done()
+
+class PreviewCache:
+    """
+    Small in-memory LRU of preview-sized images.
+
+    Previews are decoded at reduced resolution (JPEG draft mode, then
+    Image.reduce) before the final resample, and keyed on path, mtime and the
+    target size. prefetch() decodes upcoming previews on a background thread.
+    """
+
+    def __init__(self, max_entries=16, max_workers=2):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = set()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="preview")
+
+    def _key(self, file_path, width, height):
+        return (os.path.abspath(file_path), os.stat(file_path).st_mtime_ns, width, height)
+
+    def get(self, file_path, width, height):
+        """Return file_path scaled to fit width x height, decoding it only on a miss."""
+        key = self._key(file_path, width, height)
+        with self._lock:
+            img = self._entries.get(key)
+            if img is not None:
+                self._entries.move_to_end(key)
+                return img
+
+        img = self.render(file_path, width, height)
+        self._store(key, img)
+        return img
+
+    def render(self, file_path, width, height):
+        """Decode file_path at the smallest resolution that still covers width x height."""
+        img = Image.open(file_path)
+        img.draft("RGB", (width, height))
+
+        # Resize image while maintaining aspect ratio
+        img_width, img_height = img.size
+        ratio = min(width / img_width, height / img_height)
+        new_width = max(1, int(img_width * ratio))
+        new_height = max(1, int(img_height * ratio))
+
+        # Cheap integer downscale first, so LANCZOS only works on a small image
+        factor = min(img_width // new_width, img_height // new_height)
+        if factor >= 2:
+            img = img.reduce(factor)
+        return img.resize((new_width, new_height), Image.LANCZOS)
+
+    def _store(self, key, img):
+        with self._lock:
+            self._entries[key] = img
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def prefetch(self, file_paths, width, height):
+        """Decode previews for file_paths in the background if they are not cached yet."""
+        for file_path in file_paths:
+            try:
+                key = self._key(file_path, width, height)
+            except OSError:
+                continue
+            with self._lock:
+                if key in self._entries or key in self._pending:
+                    continue
+                self._pending.add(key)
+            self.executor.submit(self._prefetch_one, key, file_path, width, height)
+
+    def _prefetch_one(self, key, file_path, width, height):
+        try:
+            self._store(key, self.render(file_path, width, height))
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._pending.discard(key)
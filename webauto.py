@@ -1,387 +1,798 @@
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import (
+    TimeoutException, NoSuchElementException, StaleElementReferenceException, WebDriverException
+)
 from selenium.webdriver.common.keys import Keys
 import os
-import random
 import time
+import threading
+from appdata import data_path
+from selectorengine import SelectorResolver
+from steptrace import StepTracer
+import progress
+from storymedia import MediaPipeline
+from jobjournal import JobJournal, JobCancelled
+from photodedup import DuplicateIndex
+from storyselect import select_photos, history_from_catalog, DEFAULT_POLICY, POLICY_RANDOM
 
 # Configuration variables
 NUM_PHOTOS_TO_POST = 5  # Change this value to post more or fewer photos
 HEADLESS_MODE = False   # Set to True to run without browser UI
 
-def post_whatsapp_stories(photo_directory, num_photos, headless=False):
+WHATSAPP_URL = 'https://web.whatsapp.com/'
+
+# Photo types WhatsApp status accepts from the file input
+VALID_EXTENSIONS = ['.jpg', '.jpeg', '.png']
+
+# WhatsApp Web refuses the "HeadlessChrome" user agent
+HEADLESS_USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+)
+
+# Selectors that only exist once WhatsApp Web is logged in and loaded
+LOGIN_SELECTORS = [
+    "//div[@id='app']//div[@data-testid='chatlist']",
+    "//div[@id='side']",
+    "//div[@data-testid='chat-list']",
+    "//div[@data-testid='default-user']",
+    "//div[@aria-label='Chat list']",
+    "//span[contains(text(), 'Communities')]",
+    "//span[contains(text(), 'Chats')]"
+]
+
+# Evaluates every XPath in arguments[0] in one round trip and returns the
+# index of the first one that matches, or -1
+FIND_FIRST_XPATH_JS = """
+const selectors = arguments[0];
+for (let i = 0; i < selectors.length; i++) {
+    try {
+        const result = document.evaluate(selectors[i], document, null,
+            XPathResult.FIRST_ORDERED_NODE_TYPE, null);
+        if (result.singleNodeValue) { return i; }
+    } catch (e) {}
+}
+return -1;
+"""
+
+def wait_for_any_selector(driver, selectors, timeout, poll_frequency=0.25, cancel_token=None):
     """
-    Posts random photos from a directory to WhatsApp Web stories.
-    
+    Wait until any of several XPath selectors matches, checking all of them per tick.
+
     Args:
-        photo_directory (str): Path to the directory containing photos
-        num_photos (int): Number of photos to randomly select and post
-        headless (bool): Whether to run browser in headless mode
+        driver: Selenium WebDriver
+        selectors (list): XPath selectors to check
+        timeout (float): Overall deadline in seconds for all selectors together
+        poll_frequency (float): Seconds between checks
+        cancel_token (CancelToken): Optional token checked on every tick
+
+    Returns:
+        str: The selector that matched, or None if none matched before the deadline
+
+    Raises:
+        JobCancelled: If cancel_token is cancelled while waiting
     """
-    # Setup WebDriver with options
-    options = webdriver.ChromeOptions()
-    options.add_argument("--start-maximized")
-    
-    if headless:
-        options.add_argument("--headless")
-        options.add_argument("--disable-gpu")
-        print("Running in headless mode")
-    
-    driver = webdriver.Chrome(options=options)
-    
+    def first_match(d):
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        index = d.execute_script(FIND_FIRST_XPATH_JS, selectors)
+        return selectors[index] if index is not None and index >= 0 else False
+
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(first_match)
+    except TimeoutException:
+        return None
+
+# Candidate selectors per step, in their original priority order. The
+# SelectorResolver reorders them at run time from what actually worked.
+STATUS_SELECTORS = [
+    "//button[@role='button'][@data-tab='2'][@aria-label='Status']",
+    "//button[@aria-label='Status']",
+    "//button[@data-tab='2']",
+    "//button[.//span[@data-icon='status']]",
+    "//button[contains(@class, 'x78zum5')]",
+    "//span[@data-icon='status']",
+    "//button[.//span[@data-icon='status']]/..",
+    "//svg[.//title='status']/..",
+    "JSCLICK:document.querySelector('button[data-tab=\"2\"]')",
+    "JSCLICK:document.querySelector('button[aria-label=\"Status\"]')",
+    "JSCLICK:document.querySelector('span[data-icon=\"status\"]').closest('button')"
+]
+
+ADD_STATUS_SELECTORS = [
+    "//button[@aria-label='Add Status'][@data-tab='2']",
+    "//button[@title='Add Status']",
+    "//button[.//span[@data-icon='plus']][@data-tab='2']",
+    "//button[@aria-label='Add Status']",
+    "//button[@data-tab='2']",
+    "CSS:button[aria-label='Add Status']",
+    "CSS:button[data-tab='2']",
+    "JSCLICK:document.querySelector('button[aria-label=\"Add Status\"]')",
+    "JSCLICK:document.querySelector('button[data-tab=\"2\"]')"
+]
+
+PHOTOS_VIDEOS_SELECTORS = [
+    "//span[@data-icon='media-multiple']/parent::div",
+    "//div[.//span[@data-icon='media-multiple']]",
+    "//span[text()='Photos & videos']/parent::div",
+    "//div[contains(@class, 'x1c4vz4f')][.//span[@data-icon='media-multiple']]",
+    "CSS:div:has(span[data-icon='media-multiple'])",
+    "CSS:span.x1o2sk6j:contains('Photos & videos')",
+    "JSCLICK:document.querySelector('span[data-icon=\"media-multiple\"]').closest('div')",
+    "JSCLICK:Array.from(document.querySelectorAll('span')).find(el => el.textContent.includes('Photos & videos')).closest('div')"
+]
+
+INPUT_SELECTORS = [
+    "//input[@type='file']",
+    "//input[contains(@accept, 'image')]",
+    "//input[contains(@type, 'file')]",
+    "CSS:input[type='file']"
+]
+
+SEND_SELECTORS = [
+    "//div[contains(@aria-label, 'Send')]",
+    "//div[@data-testid='send']",
+    "//span[contains(text(), 'Send')]//ancestor::div[@role='button']",
+    "//button[contains(@aria-label, 'Send')]",
+    "//div[@role='button'][contains(@class, 'send')]",
+    "//div[@role='button'][.//span[@data-icon='send']]",
+    "CSS:div[data-testid='send']",
+    "CSS:div[role='button']:has(span[data-icon='send'])"
+]
+
+# Photos prepared ahead of the one being posted
+PIPELINE_DEPTH = 4
+
+# Photos attached per Add Status round trip (newline-joined paths in one send_keys)
+BATCH_SIZE = 10
+
+# Ceiling in seconds for each wait. Steps finish as soon as their readiness
+# signal appears; these only bound how long a missing signal can cost.
+STEP_TIMEOUTS = {
+    "login": 30,
+    "status_tab": 15,
+    "status_page": 3,
+    "add_status": 10,
+    "media_menu": 10,
+    "file_input": 5,
+    "send": 15,
+    "send_per_photo": 5,  # Added to "send" for every further photo in a batch upload
+    "send_confirm": 10,
+}
+
+# What happens to the browser when a posting run finishes
+ON_FINISH_RELEASE = "release"  # Hand the driver back to its session (or pool) for the next run
+ON_FINISH_KEEP = "keep"        # Leave the browser window open, detached from this run
+ON_FINISH_CLOSE = "close"      # Quit the browser
+ON_FINISH_POLICIES = (ON_FINISH_RELEASE, ON_FINISH_KEEP, ON_FINISH_CLOSE)
+
+# Resolves once the DOM has had no mutations for arguments[0] ms, or after
+# arguments[1] ms at the latest. The result is the number of ms waited.
+WAIT_FOR_DOM_SETTLED_JS = """
+const quietMs = arguments[0];
+const timeoutMs = arguments[1];
+const done = arguments[arguments.length - 1];
+const start = performance.now();
+let timer = null;
+const observer = new MutationObserver(() => {
+    clearTimeout(timer);
+    timer = setTimeout(finish, quietMs);
+});
+function finish() {
+    observer.disconnect();
+    clearTimeout(ceiling);
+    done(Math.round(performance.now() - start));
+}
+const ceiling = setTimeout(finish, timeoutMs);
+observer.observe(document.body, {childList: true, subtree: true, attributes: true});
+timer = setTimeout(finish, quietMs);
+"""
+
+def wait_for_dom_settled(driver, timeout, quiet_ms=150):
+    """
+    Wait until the page stops mutating, e.g. after a view switch.
+
+    Args:
+        driver: Selenium WebDriver
+        timeout (float): Ceiling in seconds
+        quiet_ms (int): How long the DOM must stay unchanged
+
+    Returns:
+        float: Seconds waited
+    """
+    driver.set_script_timeout(timeout + 5)
+    try:
+        return driver.execute_async_script(WAIT_FOR_DOM_SETTLED_JS, quiet_ms, int(timeout * 1000)) / 1000
+    except WebDriverException:
+        return timeout
+
+def wait_until_gone(driver, element, timeout):
+    """
+    Wait until element is removed from the page or hidden.
+
+    Returns:
+        bool: True if it went away before the timeout
+    """
+    def gone(d):
+        try:
+            return not element.is_displayed()
+        except StaleElementReferenceException:
+            return True
+
     try:
-        # Navigate to WhatsApp Web
-        driver.get('https://web.whatsapp.com/')
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(gone)
+        return True
+    except TimeoutException:
+        return False
+
+def default_profile_dir():
+    """Return the persistent Chrome profile directory used to keep WhatsApp logged in."""
+    return data_path("chrome-profile")
+
+class BrowserSession:
+    """
+    Owns one long-lived Chrome driver that is reused across posting runs.
+
+    The driver uses a persistent user-data-dir, so the WhatsApp login survives
+    both repeated runs and application restarts. acquire() checks that the
+    browser is still alive and starts a new one only if it is not.
+    """
+
+    def __init__(self, profile_dir=None, headless=False, performance_log=False, url=None):
+        self.profile_dir = profile_dir or default_profile_dir()
+        self.headless = headless
+        # Another page to drive instead of WhatsApp Web, e.g. mockwhatsapp's local stand-in
+        self.url = url or WHATSAPP_URL
+        # Let StepTracer.capture_performance_log() save Chrome's network/page timeline
+        self.performance_log = performance_log
+        self.driver = None
+        self.logged_in = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start a new Chrome instance on the persistent profile and open WhatsApp Web."""
+        os.makedirs(self.profile_dir, exist_ok=True)
         
-        # Wait for user to scan QR code and for WhatsApp to load
-        print("Please scan the QR code to log in to WhatsApp Web")
-        print("Waiting for login (up to 30 seconds)...")
+        # Setup WebDriver with options
+        options = webdriver.ChromeOptions()
+        options.add_argument("--start-maximized")
+        options.add_argument(f"--user-data-dir={self.profile_dir}")
         
-        # Try different possible selectors for detecting a successful login
-        login_successful = False
-        login_selectors = [
-            "//div[@id='app']//div[@data-testid='chatlist']",
-            "//div[@id='side']",
-            "//div[@data-testid='chat-list']",
-            "//div[@data-testid='default-user']",
-            "//div[@aria-label='Chat list']",
-            "//span[contains(text(), 'Communities')]",
-            "//span[contains(text(), 'Chats')]"
-        ]
+        if self.headless:
+            options.add_argument("--headless=new")
+            options.add_argument("--disable-gpu")
+            options.add_argument("--window-size=1280,900")
+            options.add_argument(f"--user-agent={HEADLESS_USER_AGENT}")
+            # Needed on display-less Linux servers and in containers
+            options.add_argument("--no-sandbox")
+            options.add_argument("--disable-dev-shm-usage")
+            print("Running in headless mode")
+        
+        if self.performance_log:
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
         
-        login_successful = False
-        for selector in login_selectors:
+        self.driver = webdriver.Chrome(options=options)
+        self.logged_in = False
+        self.driver.get(self.url)
+        return self.driver
+
+    def is_healthy(self):
+        """Return True if the browser is still running and showing WhatsApp Web."""
+        if self.driver is None:
+            return False
+        try:
+            return self.driver.current_url.startswith(self.url)
+        except Exception:
+            return False
+
+    def is_logged_in(self):
+        """Quick, non-waiting check that the loaded page is a logged-in WhatsApp Web."""
+        if not self.is_healthy():
+            return False
+        try:
+            return self.driver.execute_script(FIND_FIRST_XPATH_JS, LOGIN_SELECTORS) >= 0
+        except Exception:
+            return False
+
+    def acquire(self):
+        """Return a live driver, reusing the current one if it is healthy."""
+        with self._lock:
+            if self.is_healthy():
+                print("Reusing existing browser session")
+                return self.driver
+            
+            if self.driver is not None:
+                # Still alive but navigated away: go back instead of restarting Chrome
+                try:
+                    self.driver.get(self.url)
+                    self.logged_in = False
+                    return self.driver
+                except Exception:
+                    self.close()
+            return self.start()
+
+    def close(self):
+        """Quit the browser."""
+        if self.driver is not None:
             try:
-                WebDriverWait(driver, 30).until(
-                    EC.presence_of_element_located((By.XPATH, selector))
-                )
-                login_successful = True
-                print("Successfully logged in!")
-                # Give a moment for the interface to fully load
-                time.sleep(3)
-                break
-            except:
-                continue
-                
-        if not login_successful:
-            print("Login timed out. Please try again and scan the QR code more quickly.")
-            return
+                self.driver.quit()
+            except Exception:
+                pass
+        self.driver = None
+        self.logged_in = False
+
+class MultipleFilesRejected(Exception):
+    """The status composer's file input does not accept several files at once."""
+
+def close_composer(driver):
+    """Dismiss an open status composer or attach menu."""
+    try:
+        driver.find_element(By.TAG_NAME, "body").send_keys(Keys.ESCAPE)
+        wait_for_dom_settled(driver, 1)
+    except WebDriverException:
+        pass
+
+def list_story_photos(photo_directory, photo_index=None):
+    """
+    Return the postable photos in photo_directory.
+
+    The live index is preferred, then a plain directory listing. The catalog
+    is not used for listing: it is synced in the background and may only
+    hold part of a folder; it supplies posting history and hashes instead.
+    """
+    all_photos = []
+    if photo_index is not None:
+        all_photos = [
+            path for path in photo_index.photos(photo_directory)
+            if any(path.lower().endswith(ext) for ext in VALID_EXTENSIONS)
+        ]
+    else:
+        all_photos = [
+            os.path.join(photo_directory, file) 
+            for file in os.listdir(photo_directory) 
+            if os.path.isfile(os.path.join(photo_directory, file)) and 
+            any(file.lower().endswith(ext) for ext in VALID_EXTENSIONS)
+        ]
+    return all_photos
+
+def select_story_photos(all_photos, num_photos, photo_directory, catalog=None, policy=DEFAULT_POLICY,
+                        no_repeat_days=None):
+    """
+    Pick num_photos photos to post according to a selection policy (see storyselect).
+
+    The catalog supplies the posting history the policies rotate on. With a
+    catalog, exact and near-duplicate photos (see photodedup) are also never
+    picked together. Without one there is no history, so the pick is plain random.
+    Fewer photos come back if duplicates or no_repeat_days leave too few.
+    """
+    if catalog is None:
+        return select_photos(all_photos, num_photos, POLICY_RANDOM)
+    selected = select_photos(
+        all_photos, num_photos, policy,
+        history=history_from_catalog(catalog, photo_directory),
+        no_repeat_days=no_repeat_days,
+        dedup_index=DuplicateIndex.from_catalog(catalog, photo_directory)
+    )
+    if len(selected) < num_photos:
+        print(f"Only {len(selected)} photos qualify to be posted together; the others are duplicates"
+              f"{' or were posted in the last ' + str(no_repeat_days) + ' days' if no_repeat_days else ''}.")
+    return selected
+
+def post_media(driver, photo_paths, resolver, timer, timeouts, cancel_token=None, on_uploaded=None):
+    """
+    Run one Add Status -> Photos & videos -> file input -> Send round trip.
+
+    Several photos are attached at once by sending their newline-joined paths
+    to the file input, which posts each of them as its own status.
+
+    Args:
+        driver: Selenium WebDriver, already on the status page
+        photo_paths (list): Photos to attach in this round trip
+        resolver (SelectorResolver): Resolver used to find the page elements
+        timer (StepTracer): Records a span per step
+        timeouts (dict): Per-step wait ceilings
+        cancel_token (CancelToken): Optional token checked before each step up to Send
+        on_uploaded (callable): Called without arguments once the files are attached
+
+    Returns:
+        bool: True if the photos were sent
+
+    Raises:
+        MultipleFilesRejected: If several paths were given and the input only takes one
+        JobCancelled: If cancel_token was cancelled before Send was clicked
+    """
+    start = time.monotonic()
+    check_cancelled = cancel_token.raise_if_cancelled if cancel_token is not None else lambda: None
+    
+    # Each step waits for its own element to become clickable, so no
+    # fixed pauses are needed between them
+    # Step 1: Find and click the "Add Status" plus button
+    with timer.step("add_status") as span:
+        clicked = resolver.click(driver, "add_status", ADD_STATUS_SELECTORS, timeouts["add_status"], trace=span)
+    if not clicked:
+        print("Could not find the plus button. WhatsApp Web interface might have changed.")
+        return False
+        
+    # Step 2: Now look for and click the "Photos & videos" button
+    check_cancelled()
+    print("Looking for 'Photos & videos' button...")
+    with timer.step("media_menu") as span:
+        clicked = resolver.click(
+            driver, "media_menu", PHOTOS_VIDEOS_SELECTORS, timeouts["media_menu"], trace=span
+        )
+    if not clicked:
+        print("Could not find the 'Photos & videos' button after clicking plus. Trying to proceed anyway...")
+    
+    # Step 3: Handle file upload
+    check_cancelled()
+    # Hidden file inputs are fine here, so don't require a clickable element
+    with timer.step("file_input", photos=len(photo_paths)) as span:
+        file_input, selector = resolver.find(
+            driver, "file_input", INPUT_SELECTORS, timeouts["file_input"], clickable=False, trace=span
+        )
+    if file_input is not None:
+        print(f"Found file input with selector: {selector}")
+            
+    # If no file input found, try injection approach
+    if not file_input:
+        print("No standard file input found. Creating a hidden file input...")
+        
+        # Create a hidden file input element
+        input_id = driver.execute_script("""
+            // Create a file input
+            const input = document.createElement('input');
+            input.type = 'file';
+            input.accept = 'image/*';
+            input.multiple = true;
+            input.style.display = 'none';
+            input.id = 'whatsapp-file-input';
+            document.body.appendChild(input);
+            return input.id;
+        """)
         
+        file_input = driver.find_element(By.ID, input_id)
+    
+    if len(photo_paths) > 1 and file_input.get_attribute("multiple") is None:
+        raise MultipleFilesRejected("file input has no 'multiple' attribute")
+        
+    # Input the file paths (use absolute paths; Selenium takes several newline-joined)
+    abs_paths = [os.path.abspath(path) for path in photo_paths]
+    print(f"Sending {len(abs_paths)} file path(s) to input: {', '.join(abs_paths)}")
+    try:
+        file_input.send_keys("\n".join(abs_paths))
+    except WebDriverException as e:
+        if len(abs_paths) > 1:
+            raise MultipleFilesRejected(str(e).splitlines()[0])
+        raise
+    print("File path sent successfully")
+    if on_uploaded is not None:
+        on_uploaded()
+    
+    # The send button only becomes clickable once the upload preview is shown,
+    # which takes longer the more photos are attached
+    preview_timeout = timeouts["send"] + timeouts["send_per_photo"] * (len(abs_paths) - 1)
+    with timer.step("upload_preview", photos=len(photo_paths)) as span:
+        send_button, selector = resolver.find(driver, "send", SEND_SELECTORS, preview_timeout, trace=span)
+    
+    if send_button is None:
+        # A slow preview is not a rejected batch; only the checks above fall back to single photos
+        print("Could not find the 'Send' button. WhatsApp Web interface might have changed.")
+        close_composer(driver)
+        return False
+    
+    # Last point where stopping leaves nothing half-posted
+    check_cancelled()
+    with timer.step("send", photos=len(photo_paths), selector=selector) as span:
+        resolver.click_element(driver, send_button)
+        print(f"Clicked send button (selector: {selector})")
+        
+        # The composer closes once the statuses are accepted
+        confirmed = wait_until_gone(driver, send_button, timeouts["send_confirm"])
+        span["confirmed"] = confirmed
+    if not confirmed:
+        print("Send was clicked but the composer did not close; continuing anyway.")
+    
+    timer.record("round_trip", time.monotonic() - start, photos=len(photo_paths))
+    return True
+
+def finish_session(session, on_finish, owns_session):
+    """
+    Apply a completion policy to the browser used by a finished run.
+
+    Args:
+        session (BrowserSession): Session the run posted with
+        on_finish (str): One of ON_FINISH_POLICIES
+        owns_session (bool): Whether the run started the session itself; a released
+            driver of such a session has no one to reuse it and is closed
+    """
+    if on_finish == ON_FINISH_KEEP and not session.headless:
+        # Forget the driver without quitting it, so the window stays open
+        session.driver = None
+        session.logged_in = False
+        print("Browser remains open. Please close it manually when done.")
+    elif on_finish == ON_FINISH_RELEASE and not owns_session:
+        print("Browser session kept open for the next run.")
+    else:
+        session.close()
+        print("Browser closed.")
+
+def post_whatsapp_stories(photo_directory, num_photos, headless=False, photo_index=None, catalog=None,
+                          session=None, resolver=None, timeouts=None, batch_size=BATCH_SIZE,
+                          optimize=True, photos=None, cancel_token=None, journal=None, on_finish=None,
+                          trace_path=None, progress_channel=None, selection_policy=DEFAULT_POLICY,
+                          no_repeat_days=None):
+    """
+    Posts random photos from a directory to WhatsApp Web stories.
+    
+    Args:
+        photo_directory (str): Path to the directory containing photos
+        num_photos (int): Number of photos to randomly select and post
+        headless (bool): Whether to run browser in headless mode
+        photo_index (PhotoLibraryIndex): Optional live index to read the photo list from
+            instead of listing the directory
+        catalog (PhotoCatalog): Optional photo catalog to read the photo list from and
+            to record posting history in
+        session (BrowserSession): Optional long-lived session to post with. The session
+            keeps its browser open after the run; without one a new browser is started
+            and closed as before.
+        resolver (SelectorResolver): Optional selector resolver; by default one backed by
+            the persisted selector statistics is used
+        timeouts (dict): Optional overrides for the per-step wait ceilings in STEP_TIMEOUTS
+        batch_size (int): Photos attached per composer round trip; 1 posts them one by one.
+            Falls back to one by one automatically if the composer rejects several files.
+        optimize (bool): Upload story-sized, metadata-free copies (see storymedia) instead
+            of the original files
+        photos (list): Explicit photos to post instead of a random pick from photo_directory
+        cancel_token (CancelToken): Optional token; once cancelled the run stops at the
+            next step boundary and the journal is marked cancelled
+        journal (JobJournal): Journal of an interrupted run to resume; its remaining photos
+            are posted. By default a new journal is started for the selected photos;
+            pass False to post without one.
+        on_finish (str): Completion policy, one of ON_FINISH_POLICIES. The default
+            releases a shared session's driver for reuse and closes a browser started
+            just for this run. Nothing ever waits for console input.
+        trace_path (str): JSON-lines file the per-step spans are appended to (default:
+            steptrace.default_trace_path()); pass "" to disable writing them. Summarize
+            them across runs with `python steptrace.py`.
+        progress_channel (ProgressChannel): Optional channel that receives a
+            progress event as each photo is started, uploaded, sent or failed
+        selection_policy (str): How photos are picked from photo_directory, one of
+            storyselect.POLICIES (default: random weighted toward photos not posted
+            for a long time)
+        no_repeat_days (float): Never pick photos posted within this many days
+
+    Returns:
+        int: Number of photos posted
+    """
+    if on_finish is None:
+        on_finish = ON_FINISH_RELEASE if session is not None else ON_FINISH_CLOSE
+    if on_finish not in ON_FINISH_POLICIES:
+        raise ValueError(f"Unknown completion policy: {on_finish!r}")
+    resolver = resolver or SelectorResolver()
+    timeouts = dict(STEP_TIMEOUTS, **(timeouts or {}))
+    timer = StepTracer(trace_path)
+
+    if journal:
+        # Resume an interrupted run with the photos it has not posted yet
+        selected_photos = journal.remaining()
+        num_photos = len(selected_photos)
+        print(f"Resuming job {journal.job_id}: {len(journal.posted)} posted, {num_photos} remaining.")
+        if not selected_photos:
+            journal.finish()
+            return 0
+    elif photos is not None:
+        # Explicit photo list, e.g. a share handed out by the account pool
+        selected_photos = list(photos)
+        num_photos = len(selected_photos)
+        if not selected_photos:
+            print("No photos given to post.")
+            return 0
+    else:
         # Get a list of all image files in the directory
-        valid_extensions = ['.jpg', '.jpeg', '.png']
         try:
-            all_photos = [
-                os.path.join(photo_directory, file) 
-                for file in os.listdir(photo_directory) 
-                if os.path.isfile(os.path.join(photo_directory, file)) and 
-                any(file.lower().endswith(ext) for ext in valid_extensions)
-            ]
+            all_photos = list_story_photos(photo_directory, photo_index)
         except Exception as e:
             print(f"Error accessing directory {photo_directory}: {e}")
-            return
+            return 0
         
         if not all_photos:
-            print(f"No photos with extensions {valid_extensions} found in directory: {photo_directory}")
-            return
+            print(f"No photos with extensions {VALID_EXTENSIONS} found in directory: {photo_directory}")
+            return 0
         
         if len(all_photos) < num_photos:
             print(f"Warning: Only {len(all_photos)} photos found in directory. Using all available photos.")
             num_photos = len(all_photos)
         
-        # Randomly select n photos
-        selected_photos = random.sample(all_photos, num_photos)
-        print(f"Selected {num_photos} random photos from {len(all_photos)} available photos.")
-        
-        # Try different possible selectors for accessing the status/story feature
-        # Prioritized based on successful selectors from logs
-        status_selectors = [
-            # This selector worked in the logs
-            "//button[@role='button'][@data-tab='2'][@aria-label='Status']",
-            # Other alternatives
-            "//button[@aria-label='Status']",
-            "//button[@data-tab='2']",
-            "//button[.//span[@data-icon='status']]",
-            "//button[contains(@class, 'x78zum5')]",
-            "//span[@data-icon='status']",
-            "//button[.//span[@data-icon='status']]/..",
-            "//svg[.//title='status']/..",
-            "JSCLICK:document.querySelector('button[data-tab=\"2\"]')",
-            "JSCLICK:document.querySelector('button[aria-label=\"Status\"]')",
-            "JSCLICK:document.querySelector('span[data-icon=\"status\"]').closest('button')"
-        ]
+        # Select n photos (before starting the browser, so preparing them
+        # overlaps with browser start-up and login)
+        selected_photos = select_story_photos(
+            all_photos, num_photos, photo_directory, catalog, selection_policy, no_repeat_days
+        )
+        num_photos = len(selected_photos)
+        if not selected_photos:
+            print("No photos left to post with the current selection settings.")
+            return 0
+        print(f"Selected {num_photos} photos ({selection_policy}) from {len(all_photos)} available photos.")
+    
+    def emit(kind, **fields):
+        if progress_channel is not None:
+            progress_channel.emit(kind, **fields)
+    
+    emit(progress.JOB_STARTED, total=num_photos)
+    if journal is None:
+        journal = JobJournal.create(photo_directory, selected_photos)
+    if journal:
+        journal.set_state(JobJournal.RUNNING)
+    
+    # Resolve, validate, hash and optimize upcoming photos in the background
+    pipeline = MediaPipeline(selected_photos, depth=max(PIPELINE_DEPTH, batch_size), optimize=optimize).start()
+    
+    owns_driver = session is None
+    try:
+        with timer.step("driver_start", reused=not owns_driver):
+            if owns_driver:
+                session = BrowserSession(headless=headless)
+                driver = session.start()
+            else:
+                driver = session.acquire()
+    except Exception:
+        pipeline.close()
+        if journal:
+            journal.finish()
+        emit(progress.JOB_FINISHED, posted=0)
+        raise
+    
+    def post_items(items):
+        sources = [item.source for item in items]
+        emit(progress.PHOTO_STARTED, photos=sources)
+        start = time.monotonic()
+        sent = post_media(
+            driver, [item.upload_path for item in items], resolver, timer, timeouts, cancel_token,
+            on_uploaded=lambda: emit(progress.PHOTO_UPLOADED, photos=sources)
+        )
+        if sent:
+            emit(progress.PHOTO_SENT, photos=sources, elapsed=time.monotonic() - start)
+        return sent
+    
+    def record_posted(items):
+        if catalog is not None:
+            catalog.record_posts([item.source for item in items])
+        if journal:
+            journal.record_posted([item.source for item in items])
+    
+    def record_failed(items, error):
+        emit(progress.PHOTO_FAILED, photos=[item.source for item in items], error=str(error))
+        if journal:
+            for item in items:
+                journal.record_failed(item.source, error)
+    
+    def record_skipped():
+        while pipeline.skipped:
+            item = pipeline.skipped.pop(0)
+            emit(progress.PHOTO_FAILED, photos=[item.source], error=str(item.error))
+            if journal:
+                journal.record_skipped(item.source, item.error)
+    
+    check_cancelled = cancel_token.raise_if_cancelled if cancel_token is not None else lambda: None
+    posts_successful = 0
+    cancelled = False
+    try:
+        # A reused session that is still logged in can start posting right away
+        login_successful = session.logged_in and session.is_logged_in()
         
-        print("Attempting to find and click the Status/Stories tab...")
-        status_element = None
+        if not login_successful:
+            # Wait for user to scan QR code and for WhatsApp to load
+            print("Please scan the QR code to log in to WhatsApp Web")
+            print(f"Waiting for login (up to {timeouts['login']} seconds)...")
         
-        for selector in status_selectors:
-            try:
-                # Check if this is a JavaScript selector
-                if selector.startswith("JSCLICK:"):
-                    js_selector = selector[8:]
-                    print(f"Trying JavaScript click with: {js_selector}")
-                    driver.execute_script(f"if({js_selector}) {{ {js_selector}.click(); return true; }} else {{ return false; }}")
-                    time.sleep(0.5)
-                    continue
-                
-                # Regular Selenium approach
-                status_element = WebDriverWait(driver, 5).until(
-                    EC.element_to_be_clickable((By.XPATH, selector))
+            # Poll all login selectors together against one overall deadline
+            with timer.step("login") as span:
+                matched_selector = wait_for_any_selector(
+                    driver, LOGIN_SELECTORS, timeout=timeouts["login"], cancel_token=cancel_token
                 )
-                print(f"Found Status element with selector: {selector}")
-                status_element.click()
-                print(f"Clicked the Status element")
-                time.sleep(1)
-                break
-            except Exception as e:
-                print(f"Error with selector '{selector}': {str(e)[:80]}...")
-                continue
+                span["selector"] = matched_selector
+            if matched_selector:
+                login_successful = True
+                session.logged_in = True
+                print(f"Successfully logged in! (detected with selector: {matched_selector})")
+                
+        if not login_successful:
+            print("Login timed out. Please try again and scan the QR code more quickly.")
+            return 0
         
-        # Wait for the status page to load
-        time.sleep(1.5)
+        check_cancelled()
+        print("Attempting to find and click the Status/Stories tab...")
+        with timer.step("status_tab") as span:
+            resolver.click(driver, "status_tab", STATUS_SELECTORS, timeouts["status_tab"], trace=span)
         
-        # Try different possible selectors for the "Add Status" button (the plus button)
-        # Prioritized based on successful selectors from logs
-        add_status_selectors = [
-            # This selector worked in the logs
-            "//button[@aria-label='Add Status'][@data-tab='2']",
-            # Other alternatives
-            "//button[@title='Add Status']",
-            "//button[.//span[@data-icon='plus']][@data-tab='2']",
-            "//button[@aria-label='Add Status']",
-            "//button[@data-tab='2']",
-            "CSS:button[aria-label='Add Status']",
-            "CSS:button[data-tab='2']",
-            "JSCLICK:document.querySelector('button[aria-label=\"Add Status\"]')",
-            "JSCLICK:document.querySelector('button[data-tab=\"2\"]')"
-        ]
+        # Wait for the status page to finish rendering
+        with timer.step("status_page"):
+            wait_for_dom_settled(driver, timeouts["status_page"])
         
-        posts_successful = 0
-        for i, photo_path in enumerate(selected_photos, 1):
-            print(f"\nPosting photo {i} of {num_photos}: {os.path.basename(photo_path)}")
+        allow_multiple = batch_size > 1
+        batch_number = 0
+        while True:
+            check_cancelled()
+            # Only ready-to-send photos come off the pipeline; waiting here means
+            # preparation is the bottleneck
+            with timer.step("wait_for_media"):
+                batch = pipeline.take(batch_size if allow_multiple else 1)
+            record_skipped()
+            if not batch:
+                break
+            batch_number += 1
             
-            # Step 1: Find and click the "Add Status" plus button
-            add_status_button = None
-            for selector in add_status_selectors:
+            if len(batch) > 1:
+                print(f"\nPosting batch {batch_number} ({len(batch)} photos)")
                 try:
-                    # Check if this is a JavaScript selector
-                    if selector.startswith("JSCLICK:"):
-                        js_selector = selector[8:]
-                        print(f"Trying JavaScript click with: {js_selector}")
-                        driver.execute_script(f"try {{ const el = {js_selector}; if(el) {{ el.click(); return true; }} }} catch(e) {{ console.error(e); return false; }}")
-                        time.sleep(0.5)
-                        add_status_button = True
-                        break
-                    
-                    # Check if this is a CSS selector
-                    elif selector.startswith("CSS:"):
-                        css_selector = selector[4:]
-                        print(f"Trying CSS selector: {css_selector}")
-                        add_status_button = driver.find_element(By.CSS_SELECTOR, css_selector)
-                        add_status_button.click()
-                        print(f"Clicked element with CSS selector: {css_selector}")
-                        time.sleep(1)
-                        break
-                    
-                    # Regular Selenium approach with XPath
+                    if post_items(batch):
+                        posts_successful += len(batch)
+                        record_posted(batch)
                     else:
-                        add_status_button = WebDriverWait(driver, 5).until(
-                            EC.element_to_be_clickable((By.XPATH, selector))
-                        )
-                        add_status_button.click()
-                        print(f"Found and clicked plus button with selector: {selector}")
-                        time.sleep(1)
-                        break
+                        record_failed(batch, "composer round trip failed")
+                    continue
+                except MultipleFilesRejected as e:
+                    # Fall back to one composer round trip per photo for the rest of the run
+                    print(f"Composer rejected multiple files ({e}); posting one photo at a time.")
+                    allow_multiple = False
+                    close_composer(driver)
+                except JobCancelled:
+                    raise
                 except Exception as e:
-                    print(f"Error with selector '{selector}': {str(e)[:80]}...")
+                    print(f"Error uploading batch {batch_number}: {e}")
+                    record_failed(batch, e)
                     continue
             
-            if not add_status_button:
-                print("Could not find the plus button. WhatsApp Web interface might have changed.")
-                continue
-                
-            # Step 2: Now look for and click the "Photos & videos" button
-            print("Looking for 'Photos & videos' button...")
-            # Prioritized based on successful selectors from logs
-            photos_videos_selectors = [
-                # This selector worked in the logs
-                "//span[@data-icon='media-multiple']/parent::div",
-                # Other alternatives
-                "//div[.//span[@data-icon='media-multiple']]",
-                "//span[text()='Photos & videos']/parent::div",
-                "//div[contains(@class, 'x1c4vz4f')][.//span[@data-icon='media-multiple']]",
-                "CSS:div:has(span[data-icon='media-multiple'])",
-                "CSS:span.x1o2sk6j:contains('Photos & videos')",
-                "JSCLICK:document.querySelector('span[data-icon=\"media-multiple\"]').closest('div')",
-                "JSCLICK:Array.from(document.querySelectorAll('span')).find(el => el.textContent.includes('Photos & videos')).closest('div')"
-            ]
-            
-            photos_videos_clicked = False
-            for selector in photos_videos_selectors:
+            for item in batch:
+                check_cancelled()
+                print(f"\nPosting photo: {os.path.basename(item.source)}")
                 try:
-                    # Check if this is a JavaScript selector
-                    if selector.startswith("JSCLICK:"):
-                        js_selector = selector[8:]
-                        print(f"Trying JavaScript click with: {js_selector}")
-                        driver.execute_script(f"try {{ const el = {js_selector}; if(el) {{ el.click(); return true; }} }} catch(e) {{ console.error(e); return false; }}")
-                        time.sleep(1)
-                        photos_videos_clicked = True
-                        break
-                    
-                    # Check if this is a CSS selector
-                    elif selector.startswith("CSS:"):
-                        css_selector = selector[4:]
-                        print(f"Trying CSS selector: {css_selector}")
-                        photos_button = driver.find_element(By.CSS_SELECTOR, css_selector)
-                        photos_button.click()
-                        print(f"Clicked 'Photos & videos' with CSS selector: {css_selector}")
-                        time.sleep(1)
-                        photos_videos_clicked = True
-                        break
-                    
-                    # Regular Selenium approach with XPath
+                    if post_items([item]):
+                        posts_successful += 1
+                        record_posted([item])
                     else:
-                        photos_button = WebDriverWait(driver, 10).until(
-                            EC.element_to_be_clickable((By.XPATH, selector))
-                        )
-                        photos_button.click()
-                        print(f"Found and clicked 'Photos & videos' with selector: {selector}")
-                        time.sleep(1)
-                        photos_videos_clicked = True
-                        break
+                        record_failed([item], "composer round trip failed")
+                except JobCancelled:
+                    raise
                 except Exception as e:
-                    print(f"Error with 'Photos & videos' selector '{selector}': {str(e)[:80]}...")
+                    print(f"Error uploading photo {item.source}: {e}")
+                    record_failed([item], e)
                     continue
-            
-            if not photos_videos_clicked:
-                print("Could not find the 'Photos & videos' button after clicking plus. Trying to proceed anyway...")
-            
-            # Step 3: Handle file upload
-            try:
-                # First try standard file input approach - prioritized from logs
-                file_input = None
-                input_selectors = [
-                    # This selector worked in the logs
-                    "//input[@type='file']",
-                    # Other alternatives
-                    "//input[contains(@accept, 'image')]",
-                    "//input[contains(@type, 'file')]",
-                    "CSS:input[type='file']"
-                ]
-                
-                for selector in input_selectors:
-                    try:
-                        print(f"Looking for file input with selector: {selector}")
-                        if selector.startswith("CSS:"):
-                            file_input = driver.find_element(By.CSS_SELECTOR, selector[4:])
-                        else:
-                            file_input = driver.find_element(By.XPATH, selector)
-                            
-                        if file_input:
-                            print(f"Found file input with selector: {selector}")
-                            break
-                    except Exception as e:
-                        print(f"No file input found with selector {selector}")
-                        
-                # If no file input found, try injection approach
-                if not file_input:
-                    print("No standard file input found. Creating a hidden file input...")
-                    
-                    # Create a hidden file input element
-                    input_id = driver.execute_script("""
-                        // Create a file input
-                        const input = document.createElement('input');
-                        input.type = 'file';
-                        input.accept = 'image/*';
-                        input.style.display = 'none';
-                        input.id = 'whatsapp-file-input';
-                        document.body.appendChild(input);
-                        return input.id;
-                    """)
-                    
-                    file_input = driver.find_element(By.ID, input_id)
-                    
-                # Input the file path (use absolute path)
-                abs_path = os.path.abspath(photo_path)
-                print(f"Sending file path to input: {abs_path}")
-                file_input.send_keys(abs_path)
-                print("File path sent successfully")
-                
-                # Wait for the upload to process
-                time.sleep(1)
-                
-                # Try to find the send button - prioritized from logs
-                send_selectors = [
-                    # This selector worked in the logs
-                    "//div[contains(@aria-label, 'Send')]",
-                    # Other alternatives
-                    "//div[@data-testid='send']", 
-                    "//span[contains(text(), 'Send')]//ancestor::div[@role='button']",
-                    "//button[contains(@aria-label, 'Send')]",
-                    "//div[@role='button'][contains(@class, 'send')]",
-                    "//div[@role='button'][.//span[@data-icon='send']]",
-                    "CSS:div[data-testid='send']",
-                    "CSS:div[role='button']:has(span[data-icon='send'])"
-                ]
-                
-                send_button = None
-                for selector in send_selectors:
-                    try:
-                        if selector.startswith("CSS:"):
-                            send_button = WebDriverWait(driver, 10).until(
-                                EC.element_to_be_clickable((By.CSS_SELECTOR, selector[4:]))
-                            )
-                        else:
-                            send_button = WebDriverWait(driver, 10).until(
-                                EC.element_to_be_clickable((By.XPATH, selector))
-                            )
-                        print(f"Found send button with selector: {selector}")
-                        send_button.click()
-                        print("Clicked send button")
-                        posts_successful += 1
-                        break
-                    except Exception as e:
-                        print(f"Error with send button selector '{selector}': {str(e)[:80]}...")
-                        continue
-                
-                if not send_button:
-                    print("Could not find the 'Send' button. WhatsApp Web interface might have changed.")
-                
-                # Wait before proceeding to the next photo
-                time.sleep(1.5)
-                
-            except Exception as e:
-                print(f"Error uploading photo {photo_path}: {e}")
-                continue
         
         if posts_successful > 0:
             print(f"\nSuccessfully posted {posts_successful} out of {num_photos} photos to WhatsApp stories!")
         else:
             print("\nFailed to post any photos. WhatsApp Web interface might have changed or there might be issues with the upload process.")
+        return posts_successful
+    
+    except JobCancelled:
+        cancelled = True
+        print(f"\nPosting cancelled after {posts_successful} photos.")
+        return posts_successful
     
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
+        return posts_successful
     
     finally:
-        # Ask if user wants to keep the browser open
-        if not headless:
-            try:
-                keep_open = input("Do you want to keep the browser open? (y/n): ")
-                if keep_open.lower() != 'y':
-                    driver.quit()
-                    print("Browser closed.")
-                else:
-                    print("Browser remains open. Please close it manually when done.")
-            except KeyboardInterrupt:
-                print("\nProgram interrupted. Closing browser.")
-                driver.quit()
-            except Exception as e:
-                print(f"\nError during browser closure prompt: {e}")
-                driver.quit()
-                print("Browser closed due to error.")
-        else:
-            driver.quit()
-            print("Headless browser closed.")
+        pipeline.close()
+        if journal:
+            if cancelled:
+                journal.set_state(JobJournal.CANCELLED)
+            else:
+                journal.finish()
+        resolver.save()
+        if session.performance_log and session.driver is not None:
+            perf_path = timer.capture_performance_log(session.driver)
+            if perf_path:
+                print(f"Chrome performance log saved to {perf_path}")
+        timer.finish(photos=num_photos, posted=posts_successful, cancelled=cancelled)
+        emit(progress.JOB_FINISHED, posted=posts_successful, cancelled=cancelled)
+        if timer.durations:
+            print("\nStep timings:")
+            print(timer.summary())
+        
+        finish_session(session, on_finish, owns_driver)
 